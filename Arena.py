@@ -1,5 +1,8 @@
 import logging
+import multiprocessing
+import random
 
+import numpy as np
 from tqdm import tqdm
 
 log = logging.getLogger(__name__)
@@ -41,7 +44,8 @@ class Arena():
         curPlayer = 1
         board = self.game.getInitBoard()
         it = 0
-        while self.game.getGameEnded(board, curPlayer) == 0:
+        result = self.game.getGameEnded(board, curPlayer)
+        while result == 0:
             it += 1
             if verbose:
                 assert self.display
@@ -56,11 +60,12 @@ class Arena():
                 log.debug(f'valids = {valids}')
                 assert valids[action] > 0
             board, curPlayer = self.game.getNextState(board, curPlayer, action)
+            result = self.game.getGameEndedAfterMove(board, curPlayer, action)
         if verbose:
             assert self.display
             print("Game over: Turn ", str(it), "Result ", str(self.game.getGameEnded(board, 1)))
             self.display(board)
-        return curPlayer * self.game.getGameEnded(board, curPlayer)
+        return curPlayer * result
 
     def playGames(self, num, verbose=False):
         """
@@ -98,3 +103,92 @@ class Arena():
                 draws += 1
 
         return oneWon, twoWon, draws
+
+
+class ParallelArena():
+    """
+    An Arena that spreads its games over a pool of worker processes.
+
+    Players can't be sent to other processes (they are usually lambdas around
+    an MCTS), so they are built in the workers by two picklable factories.
+    A factory is called with the game before each game and returns a fresh
+    player function, so every game starts from the same player state no
+    matter which worker plays it. A factory should keep what is expensive to
+    build, such as a loaded network, between calls (see Coach.MCTSPlayerFactory).
+    """
+
+    def __init__(self, playerFactory1, playerFactory2, game, numWorkers, seed=None, display=None):
+        """
+        Input:
+            playerFactory 1,2: picklable functions that take a game as input
+                               and return a player (see Arena)
+            game: Game object
+            numWorkers: number of worker processes
+            seed: if set, game i is seeded from (seed, i), so results don't
+                  depend on numWorkers. Otherwise games get random seeds.
+            display: see Arena
+        """
+        self.playerFactory1 = playerFactory1
+        self.playerFactory2 = playerFactory2
+        self.game = game
+        self.numWorkers = numWorkers
+        self.seed = seed
+        self.display = display
+
+    def playGames(self, num, verbose=False):
+        """
+        Plays num games in which player1 starts num/2 games and player2 starts
+        num/2 games.
+
+        Returns:
+            oneWon: games won by player1
+            twoWon: games won by player2
+            draws:  games won by nobody
+        """
+        num = int(num / 2)
+        if self.seed is None:
+            seeds = np.random.randint(2 ** 31, size=2 * num).tolist()
+        else:
+            seeds = [int(np.random.SeedSequence([self.seed, i]).generate_state(1)[0]) for i in range(2 * num)]
+        games = [(i >= num, seed, verbose) for i, seed in enumerate(seeds)]
+
+        oneWon = 0
+        twoWon = 0
+        draws = 0
+        initargs = (self.playerFactory1, self.playerFactory2, self.game, self.display)
+        with multiprocessing.Pool(self.numWorkers, initializer=initArenaWorker, initargs=initargs) as pool:
+            for gameResult in tqdm(pool.imap(playArenaGame, games), total=len(games), desc="Arena.playGames"):
+                if gameResult == 1:
+                    oneWon += 1
+                elif gameResult == -1:
+                    twoWon += 1
+                else:
+                    draws += 1
+
+        return oneWon, twoWon, draws
+
+
+arenaWorker = None  # (playerFactory1, playerFactory2, game, display) of the current worker process
+
+
+def initArenaWorker(playerFactory1, playerFactory2, game, display):
+    global arenaWorker
+    arenaWorker = (playerFactory1, playerFactory2, game, display)
+
+
+def playArenaGame(task):
+    """
+    Plays one game of a ParallelArena in a worker process.
+
+    Returns:
+        the result of the game for the first player of the ParallelArena, as
+        returned by Arena.playGame
+    """
+    swapped, seed, verbose = task
+    playerFactory1, playerFactory2, game, display = arenaWorker
+    np.random.seed(seed)
+    random.seed(seed)
+    player1, player2 = playerFactory1(game), playerFactory2(game)
+    if swapped:
+        return -Arena(player2, player1, game, display).playGame(verbose=verbose)
+    return Arena(player1, player2, game, display).playGame(verbose=verbose)
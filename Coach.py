@@ -1,5 +1,8 @@
+import json
 import logging
+import multiprocessing
 import os
+import re
 import sys
 from collections import deque
 from pickle import Pickler, Unpickler
@@ -8,11 +11,18 @@ from random import shuffle
 import numpy as np
 from tqdm import tqdm
 
-from Arena import Arena
+from Arena import Arena, ParallelArena
+from EvaluationCache import CachedNNet, evaluationCache
+from InferenceServer import InferenceServer
 from MCTS import MCTS
+from ReplayBuffer import ReplayBuffer
+from VectorizedSelfPlay import VectorizedSelfPlay
+from utils import SymmetricExamples
 
 log = logging.getLogger(__name__)
 
+SEGMENT_PATTERN = re.compile(r'\.examples\.(\d+)\.segment$')  # the number of a segment file of saveTrainExamples
+
 
 class Coach():
     """
@@ -27,7 +37,15 @@ class Coach():
         self.args = args
         self.mcts = MCTS(self.game, self.nnet, self.args)
         self.trainExamplesHistory = []  # history of examples from args.numItersForTrainExamplesHistory latest iterations
+        self.historySegments = []  # the segment file of each entry of trainExamplesHistory, None until it is saved
+        self.replayBuffer = None  # replaces trainExamplesHistory with args.replayBuffer
+        if self.args.get('replayBuffer'):
+            self.replayBuffer = ReplayBuffer(os.path.join(self.args.checkpoint, 'replay'),
+                                             self.args.numItersForTrainExamplesHistory)
         self.skipFirstSelfPlay = False  # can be overriden in loadTrainExamples()
+        self.nnetVersion = 0  # identifies the weights of nnet in the evaluation cache
+        self.pnetVersion = None
+        self.latestVersion = 0
 
     def executeEpisode(self):
         """
@@ -56,14 +74,17 @@ class Coach():
             temp = int(episodeStep < self.args.tempThreshold)
 
             pi = self.mcts.getActionProb(canonicalBoard, temp=temp)
-            sym = self.game.getSymmetries(canonicalBoard, pi)
+            if self.args.get('lazySymmetries'):
+                sym = [(canonicalBoard, pi)]  # the symmetries are applied when training, see SymmetricExamples
+            else:
+                sym = self.game.getSymmetries(canonicalBoard, pi)
             for b, p in sym:
                 trainExamples.append([b, self.curPlayer, p, None])
 
             action = np.random.choice(len(pi), p=pi)
             board, self.curPlayer = self.game.getNextState(board, self.curPlayer, action)
 
-            r = self.game.getGameEnded(board, self.curPlayer)
+            r = self.game.getGameEndedAfterMove(board, self.curPlayer, action)
 
             if r != 0:
                 return [(x[0], x[2], r * ((-1) ** (x[1] != self.curPlayer))) for x in trainExamples]
@@ -84,63 +105,228 @@ class Coach():
             if not self.skipFirstSelfPlay or i > 1:
                 iterationTrainExamples = deque([], maxlen=self.args.maxlenOfQueue)
 
-                for _ in tqdm(range(self.args.numEps), desc="Self Play"):
-                    self.mcts = MCTS(self.game, self.nnet, self.args)  # reset search tree
-                    iterationTrainExamples += self.executeEpisode()
+                for episodeExamples in self.selfPlay(i):
+                    iterationTrainExamples += episodeExamples
 
                 # save the iteration examples to the history 
-                self.trainExamplesHistory.append(iterationTrainExamples)
-
-            if len(self.trainExamplesHistory) > self.args.numItersForTrainExamplesHistory:
-                log.warning(
-                    f"Removing the oldest entry in trainExamples. len(trainExamplesHistory) = {len(self.trainExamplesHistory)}")
-                self.trainExamplesHistory.pop(0)
-            # backup history to a file
-            # NB! the examples were collected using the model from the previous iteration, so (i-1)  
-            self.saveTrainExamples(i - 1)
-
-            # shuffle examples before training
-            trainExamples = []
-            for e in self.trainExamplesHistory:
-                trainExamples.extend(e)
-            shuffle(trainExamples)
+                if self.replayBuffer is not None:
+                    self.replayBuffer.addIteration(iterationTrainExamples)
+                else:
+                    self.trainExamplesHistory.append(iterationTrainExamples)
+                    self.historySegments.append(None)
+
+            if self.replayBuffer is not None:
+                # the examples are read lazily from the shards on disk, NNet.train samples them at random
+                trainExamples = self.replayBuffer.examples()
+            else:
+                if len(self.trainExamplesHistory) > self.args.numItersForTrainExamplesHistory:
+                    log.warning(
+                        f"Removing the oldest entry in trainExamples. len(trainExamplesHistory) = {len(self.trainExamplesHistory)}")
+                    self.trainExamplesHistory.pop(0)
+                    self.historySegments.pop(0)
+                # backup history to a file
+                # NB! the examples were collected using the model from the previous iteration, so (i-1)  
+                self.saveTrainExamples(i - 1)
+
+                # shuffle examples before training
+                trainExamples = []
+                for e in self.trainExamplesHistory:
+                    trainExamples.extend(e)
+                shuffle(trainExamples)
+            if self.args.get('lazySymmetries'):
+                trainExamples = SymmetricExamples(trainExamples, self.game)
 
             # training new network, keeping a copy of the old one
             self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
             self.pnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
-            pmcts = MCTS(self.game, self.pnet, self.args)
+            self.pnetVersion = self.nnetVersion
 
             self.nnet.train(trainExamples)
-            nmcts = MCTS(self.game, self.nnet, self.args)
+            self.latestVersion += 1
+            self.nnetVersion = self.latestVersion
 
             log.info('PITTING AGAINST PREVIOUS VERSION')
-            arena = Arena(lambda x: np.argmax(pmcts.getActionProb(x, temp=0)),
-                          lambda x: np.argmax(nmcts.getActionProb(x, temp=0)), self.game)
+            numArenaWorkers = self.args.get('numArenaWorkers', 1)
+            if numArenaWorkers > 1:
+                self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='arena.pth.tar')
+                nnetClass = self.nnet.__class__
+                arena = ParallelArena(MCTSPlayerFactory(nnetClass, self.args.checkpoint, 'temp.pth.tar', self.args),
+                                      MCTSPlayerFactory(nnetClass, self.args.checkpoint, 'arena.pth.tar', self.args),
+                                      self.game, numArenaWorkers, seed=self.getArenaSeed(i))
+            else:
+                pmcts = MCTS(self.game, self.evaluator(self.pnet, self.pnetVersion), self.args)
+                nmcts = MCTS(self.game, self.evaluator(self.nnet, self.nnetVersion), self.args)
+                arena = Arena(lambda x: np.argmax(pmcts.getActionProb(x, temp=0)),
+                              lambda x: np.argmax(nmcts.getActionProb(x, temp=0)), self.game)
             pwins, nwins, draws = arena.playGames(self.args.arenaCompare)
 
             log.info('NEW/PREV WINS : %d / %d ; DRAWS : %d' % (nwins, pwins, draws))
             if pwins + nwins == 0 or float(nwins) / (pwins + nwins) < self.args.updateThreshold:
                 log.info('REJECTING NEW MODEL')
                 self.nnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
+                self.nnetVersion = self.pnetVersion
             else:
                 log.info('ACCEPTING NEW MODEL')
                 self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=self.getCheckpointFile(i))
                 self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='best.pth.tar')
+            # only the evaluations of the network kept for the next iteration stay valid
+            evaluationCache.invalidate(keepVersion=self.nnetVersion)
+
+    def selfPlay(self, iteration):
+        """
+        Plays the numEps self-play episodes of an iteration, either one after
+        another in this process or spread over args.numSelfPlayWorkers worker
+        processes. Each worker keeps its own MCTS and either loads the current
+        weights of nnet or, with args.inferenceServer, sends its predictions
+        to an InferenceServer shared by all workers.
+
+        With args.seed set, every episode is seeded from (seed, iteration,
+        episode), so both modes produce the same examples.
+
+        In a single process, with args.numLockstepGames > 1, the episodes are
+        played in lockstep by a VectorizedSelfPlay instead. It yields them in
+        the order they end and, since they share the random state, is seeded
+        once per iteration.
+
+        Yields:
+            trainExamples: the examples of every episode as returned by
+                           executeEpisode, in episode order
+        """
+        numWorkers = self.args.get('numSelfPlayWorkers', 1)
+        seeds = [self.getEpisodeSeed(iteration, episode) for episode in range(self.args.numEps)]
+
+        if numWorkers <= 1 and self.args.get('numLockstepGames', 1) > 1:
+            if seeds and seeds[0] is not None:
+                np.random.seed(seeds[0])
+            selfPlay = VectorizedSelfPlay(self.game, self.evaluator(self.nnet, self.nnetVersion), self.args)
+            yield from tqdm(selfPlay.playEpisodes(self.args.numEps), total=self.args.numEps, desc="Self Play")
+            return
+
+        if numWorkers <= 1:
+            for seed in tqdm(seeds, desc="Self Play"):
+                if seed is not None:
+                    np.random.seed(seed)
+                self.mcts = MCTS(self.game, self.evaluator(self.nnet, self.nnetVersion), self.args)  # reset search tree
+                yield self.executeEpisode()
+            return
+
+        # workers start from a copy of the random state, so episodes have to be seeded to differ
+        seeds = [np.random.randint(2 ** 31) if seed is None else seed for seed in seeds]
+        self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='selfplay.pth.tar')
+        initargs = (self.game, self.nnet.__class__, self.args, self.args.checkpoint, 'selfplay.pth.tar')
+        if not self.args.get('inferenceServer'):
+            with multiprocessing.Pool(numWorkers, initializer=initSelfPlayWorker, initargs=initargs) as pool:
+                yield from tqdm(pool.imap(executeSelfPlayEpisode, seeds), total=len(seeds), desc="Self Play")
+            return
+
+        server = InferenceServer(self.game, self.nnet.__class__, self.args.checkpoint, 'selfplay.pth.tar', numWorkers,
+                                 maxBatchSize=self.args.get('inferenceMaxBatchSize', 64),
+                                 maxWait=self.args.get('inferenceMaxWait', 0.002))
+        clientIds = multiprocessing.Queue()
+        for clientId in range(numWorkers):
+            clientIds.put(clientId)
+        initargs += ([server.getClient(clientId) for clientId in range(numWorkers)], clientIds)
+        with server, multiprocessing.Pool(numWorkers, initializer=initSelfPlayWorker, initargs=initargs) as pool:
+            yield from tqdm(pool.imap(executeSelfPlayEpisode, seeds), total=len(seeds), desc="Self Play")
+
+    def evaluator(self, nnet, version):
+        """
+        Returns:
+            nnet, wrapped in a CachedNNet that shares evaluationCache under the
+            given version if args.evalCacheSize is set
+        """
+        if not self.args.get('evalCacheSize'):
+            return nnet
+        evaluationCache.maxSize = self.args.evalCacheSize
+        return CachedNNet(self.game, nnet, version, symmetries=self.args.get('evalCacheSymmetries', False))
+
+    def getEpisodeSeed(self, iteration, episode):
+        if self.args.get('seed') is None:
+            return None
+        return int(np.random.SeedSequence([self.args.seed, iteration, episode]).generate_state(1)[0])
+
+    def getArenaSeed(self, iteration):
+        if self.args.get('seed') is None:
+            return None
+        return int(np.random.SeedSequence([self.args.seed, iteration]).generate_state(1)[0])
 
     def getCheckpointFile(self, iteration):
         return 'checkpoint_' + str(iteration) + '.pth.tar'
 
     def saveTrainExamples(self, iteration):
+        """
+        Saves trainExamplesHistory with the checkpoint of iteration.
+
+        By default the whole history is pickled to one .examples file. With
+        args.incrementalExamples, only the entries not saved yet are pickled,
+        each to its own .segment file, next to a small .manifest file that
+        lists the segments of the whole history.
+        """
         folder = self.args.checkpoint
         if not os.path.exists(folder):
             os.makedirs(folder)
+        if self.args.get('incrementalExamples'):
+            segmentNo = self.getLastSegmentNo(folder)
+            for k, segment in enumerate(self.historySegments):
+                if segment is None:
+                    # segments are numbered across runs and never overwritten, older manifests still list them
+                    segmentNo += 1
+                    segment = self.getCheckpointFile(iteration) + ".examples.%d.segment" % segmentNo
+                    with open(os.path.join(folder, segment), "xb") as f:
+                        Pickler(f).dump(self.trainExamplesHistory[k])
+                    self.historySegments[k] = segment
+            manifestFile = os.path.join(folder, self.getCheckpointFile(iteration) + ".examples.manifest")
+            with open(manifestFile + ".tmp", "w") as f:
+                json.dump({'segments': self.historySegments}, f)
+            os.replace(manifestFile + ".tmp", manifestFile)
+            return
         filename = os.path.join(folder, self.getCheckpointFile(iteration) + ".examples")
         with open(filename, "wb+") as f:
             Pickler(f).dump(self.trainExamplesHistory)
         f.closed
 
+    def getLastSegmentNo(self, folder):
+        """
+        Returns:
+            segmentNo: the highest number of the .segment files in folder, 0 if
+                       there are none
+        """
+        numbers = [int(m.group(1)) for m in map(SEGMENT_PATTERN.search, os.listdir(folder)) if m]
+        return max(numbers, default=0)
+
     def loadTrainExamples(self):
+        if self.replayBuffer is not None:
+            # the buffer stays in the checkpoint folder, the shards of another folder are copied there
+            loadFolder = os.path.join(self.args.load_folder_file[0], 'replay')
+            if os.path.abspath(loadFolder) != os.path.abspath(self.replayBuffer.folder) and os.path.isdir(loadFolder):
+                self.replayBuffer.addShards(loadFolder)
+            if not self.replayBuffer.iterations():
+                log.warning(f'No replay buffer shards found in "{loadFolder}"!')
+                r = input("Continue? [y|n]")
+                if r != "y":
+                    sys.exit()
+            else:
+                self.skipFirstSelfPlay = True
+            return
+
         modelFile = os.path.join(self.args.load_folder_file[0], self.args.load_folder_file[1])
+        manifestFile = modelFile + ".examples.manifest"
+        if os.path.isfile(manifestFile):
+            log.info("Manifest of trainExamples found. Loading its segments...")
+            with open(manifestFile) as f:
+                segments = json.load(f)['segments']
+            self.trainExamplesHistory = []
+            for segment in segments:
+                with open(os.path.join(self.args.load_folder_file[0], segment), "rb") as f:
+                    self.trainExamplesHistory.append(Unpickler(f).load())
+            if os.path.abspath(self.args.load_folder_file[0]) == os.path.abspath(self.args.checkpoint):
+                self.historySegments = list(segments)  # already saved, later manifests only list them again
+            else:
+                self.historySegments = [None] * len(segments)
+            log.info('Loading done!')
+            self.skipFirstSelfPlay = True
+            return
+
         examplesFile = modelFile + ".examples"
         if not os.path.isfile(examplesFile):
             log.warning(f'File "{examplesFile}" with trainExamples not found!')
@@ -151,7 +337,65 @@ class Coach():
             log.info("File with trainExamples found. Loading it...")
             with open(examplesFile, "rb") as f:
                 self.trainExamplesHistory = Unpickler(f).load()
+            self.historySegments = [None] * len(self.trainExamplesHistory)
             log.info('Loading done!')
 
             # examples based on the model were already collected (loaded)
-            self.skipFirstSelfPlay = True
\ No newline at end of file
+            self.skipFirstSelfPlay = True
+
+class SelfPlayWorker(Coach):
+    """
+    The self-play half of a Coach, run inside a worker process of
+    Coach.selfPlay. It has no competitor network.
+    """
+
+    def __init__(self, game, nnet, args):
+        self.game = game
+        self.nnet = nnet
+        self.args = args
+        self.nnetVersion = 0
+        self.mcts = MCTS(self.game, self.evaluator(self.nnet, self.nnetVersion), self.args)
+
+
+selfPlayWorker = None  # the SelfPlayWorker of the current worker process
+
+
+def initSelfPlayWorker(game, nnetClass, args, folder, filename, clients=None, clientIds=None):
+    global selfPlayWorker
+    if clients is not None:
+        nnet = clients[clientIds.get()]  # predictions are made by the InferenceServer
+    else:
+        nnet = nnetClass(game)
+        nnet.load_checkpoint(folder=folder, filename=filename)
+    evaluationCache.invalidate()  # a forked worker inherits the entries of the parent
+    selfPlayWorker = SelfPlayWorker(game, nnet, args)
+
+
+def executeSelfPlayEpisode(seed):
+    np.random.seed(seed)
+    selfPlayWorker.mcts = MCTS(selfPlayWorker.game,
+                               selfPlayWorker.evaluator(selfPlayWorker.nnet, selfPlayWorker.nnetVersion),
+                               selfPlayWorker.args)  # reset search tree
+    return selfPlayWorker.executeEpisode()
+
+
+class MCTSPlayerFactory():
+    """
+    A player factory for ParallelArena. Its players pick the most visited
+    action of a fresh MCTS guided by the network saved in folder/filename,
+    which is loaded on the first call and kept for the later ones.
+    """
+
+    def __init__(self, nnetClass, folder, filename, args):
+        self.nnetClass = nnetClass
+        self.folder = folder
+        self.filename = filename
+        self.args = args
+        self.nnet = None
+
+    def __call__(self, game):
+        if self.nnet is None:
+            self.nnet = self.nnetClass(game)
+            self.nnet.load_checkpoint(folder=self.folder, filename=self.filename)
+        mcts = MCTS(game, self.nnet, self.args)
+        return lambda x: np.argmax(mcts.getActionProb(x, temp=0))
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from NeuralNet import NeuralNet
+
+
+class EvaluationCache():
+    """
+    A least recently used cache of network evaluations (pi, v), keyed by the
+    version of the network weights and the state key of the canonical board.
+    """
+
+    def __init__(self, maxSize=100000):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, version, key):
+        """
+        Returns:
+            (pi, v) cached for key under the given network version, None if
+            there is none
+        """
+        entry = self.peek(version, key)
+        self.recordLookup(entry is not None)
+        return entry
+
+    def peek(self, version, key):
+        """
+        Like lookup, but leaves hits and misses to the caller, for lookups
+        that try several keys (see CachedNNet.lookup).
+        """
+        entry = self.entries.get((version, key))
+        if entry is not None:
+            self.entries.move_to_end((version, key))
+        return entry
+
+    def recordLookup(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def store(self, version, key, pi, v):
+        self.entries[(version, key)] = (pi, v)
+        self.entries.move_to_end((version, key))
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, keepVersion=None):
+        """
+        Drops every entry that was not computed by network version keepVersion.
+        """
+        self.entries = OrderedDict((k, e) for k, e in self.entries.items() if k[0] == keepVersion)
+
+
+evaluationCache = EvaluationCache()  # shared by the CachedNNets of the process
+
+
+class CachedNNet(NeuralNet):
+    """
+    A NeuralNet that answers predict from evaluationCache when it can and
+    forwards the other boards to nnet.
+
+    Entries are keyed by version, which has to change whenever the weights of
+    nnet do (Coach takes care of this). Networks with the same weights, such
+    as Coach's nnet and the pnet copied from it, may share a version and then
+    share their entries.
+
+    With symmetries=True, a board missing from the cache is also looked up
+    under the symmetries defined by game.getSymmetries. A hit is mapped back
+    by the same action permutation.
+    """
+
+    def __init__(self, game, nnet, version, symmetries=False, cache=evaluationCache):
+        self.game = game
+        self.nnet = nnet
+        self.version = version
+        self.symmetries = symmetries
+        self.cache = cache
+        self.actionSize = game.getActionSize()
+        self.hashing = callable(getattr(game, 'hashState', None))
+
+    def stateKey(self, board):
+        if self.hashing:
+            key = self.game.hashState(board)
+            if key is not None:
+                return key
+        return self.game.stringRepresentation(board)
+
+    def predict(self, board):
+        pis, vs = self.predict_batch([board])
+        return pis[0], vs[0]
+
+    def predict_batch(self, boards):
+        keys = [self.stateKey(board) for board in boards]
+        results = [self.lookup(board, key) for board, key in zip(boards, keys)]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            pis, vs = self.nnet.predict_batch([boards[i] for i in missing])
+            for i, pi, v in zip(missing, pis, vs):
+                v = np.asarray(v).item()
+                self.cache.store(self.version, keys[i], pi, v)
+                results[i] = (pi, v)
+
+        return np.array([pi for pi, _ in results]), np.array([v for _, v in results])
+
+    def lookup(self, board, key):
+        if not self.symmetries:
+            return self.cache.lookup(self.version, key)
+        entry = self.cache.peek(self.version, key)
+        if entry is None:
+            entry = self.symmetricLookup(board, key)
+        self.cache.recordLookup(entry is not None)
+        return entry
+
+    def symmetricLookup(self, board, key):
+        # getSymmetries applied to the action indices gives, for each symmetric
+        # board, the original action of each of its actions
+        for symBoard, perm in self.game.getSymmetries(board, np.arange(self.actionSize)):
+            symKey = self.stateKey(symBoard)
+            if symKey == key:
+                continue
+            entry = self.cache.peek(self.version, symKey)
+            if entry is not None:
+                symPi, v = entry
+                pi = np.empty(self.actionSize, dtype=np.asarray(symPi).dtype)
+                pi[np.asarray(perm, dtype=np.int64)] = symPi
+                return pi, v
+        return None
+
+    def train(self, examples):
+        self.nnet.train(examples)
+
+    def save_checkpoint(self, folder, filename):
+        self.nnet.save_checkpoint(folder=folder, filename=filename)
+
+    def load_checkpoint(self, folder, filename):
+        self.nnet.load_checkpoint(folder=folder, filename=filename)
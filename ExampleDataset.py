@@ -0,0 +1,77 @@
+import numpy as np
+import torch
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler
+
+from ReplayBuffer import toArray
+from utils import SymmetricExamples
+
+
+class ExampleDataset(Dataset):
+    """
+    The training examples (board, pi, v) of a PyTorch NNetWrapper, converted
+    once to three contiguous float32 tensors instead of batch by batch.
+
+    It is indexed with a list of example indices and returns the stacked
+    (boards, pis, vs) tensors of the whole batch, so a batch costs one gather
+    per tensor. See exampleLoader.
+
+    SymmetricExamples are the exception: since every batch needs new random
+    symmetries, their examples are transformed and converted batch by batch.
+    """
+
+    def __init__(self, examples, convertBoard=None):
+        """
+        Input:
+            examples: a list of examples (board, pi, v), a ReplayExamples or a
+                      SymmetricExamples
+            convertBoard: a function returning the network input of a board,
+                          if it is not the board itself (e.g. for Quoridor)
+        """
+        self.convertBoard = convertBoard or toArray
+        self.symmetric = examples if isinstance(examples, SymmetricExamples) else None
+        if self.symmetric is not None:
+            return
+        if convertBoard is None and hasattr(examples, 'columns'):
+            boards, pis, vs = examples.columns(np.arange(len(examples)))
+        else:
+            boards = [self.convertBoard(board) for board, _, _ in examples]
+            pis = [pi for _, pi, _ in examples]
+            vs = [v for _, _, v in examples]
+        self.boards = torch.from_numpy(np.asarray(boards, dtype=np.float32))
+        self.pis = torch.from_numpy(np.asarray(pis, dtype=np.float32))
+        self.vs = torch.from_numpy(np.asarray(vs, dtype=np.float32))
+
+    def __len__(self):
+        if self.symmetric is not None:
+            return len(self.symmetric)
+        return len(self.vs)
+
+    def __getitem__(self, ids):
+        if self.symmetric is not None:
+            batch = [self.symmetric[i] for i in ids]
+            return (torch.from_numpy(np.asarray([self.convertBoard(board) for board, _, _ in batch], dtype=np.float32)),
+                    torch.from_numpy(np.asarray([pi for _, pi, _ in batch], dtype=np.float32)),
+                    torch.from_numpy(np.asarray([v for _, _, v in batch], dtype=np.float32)))
+        ids = torch.as_tensor(ids, dtype=torch.int64)
+        return self.boards[ids], self.pis[ids], self.vs[ids]
+
+
+def exampleLoader(dataset, batch_size, cuda=False, num_workers=0):
+    """
+    Returns:
+        loader: a DataLoader of the len(dataset) / batch_size batches of an
+                epoch, each made of batch_size examples drawn at random with
+                replacement (the sampling the wrappers always used). With cuda
+                the batches are put in pinned memory, and with num_workers > 0
+                they are gathered ahead of time by background processes.
+    """
+    numBatches = len(dataset) // batch_size
+    sampler = BatchSampler(RandomSampler(dataset, replacement=True, num_samples=max(numBatches * batch_size, 1)),
+                           batch_size, drop_last=True)
+    prefetch = {'prefetch_factor': 2, 'persistent_workers': True, 'worker_init_fn': seedWorker} if num_workers > 0 else {}
+    return DataLoader(dataset, sampler=sampler, batch_size=None, pin_memory=cuda, num_workers=num_workers, **prefetch)
+
+
+def seedWorker(workerId):
+    # forked workers start with the random state of the parent, so they would draw the same symmetries
+    np.random.seed(torch.initial_seed() % 2 ** 32)
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Game():
     """
     This class specifies the base Game class. To define your own game, subclass
@@ -72,6 +75,23 @@ class Game():
         """
         pass
 
+    def getGameEndedAfterMove(self, board, player, action):
+        """
+        Optional fast path for getGameEnded.
+
+        Input:
+            board: board after the previous player took action
+            player: current player (1 or -1), who plays next on board
+            action: action the previous player took to reach board
+
+        Returns:
+            r: the same value as getGameEnded(board, player). Games can
+               override it to only check what action changed, e.g. the lines
+               through the stone it placed. MCTS, Arena and self-play call it
+               whenever they know the last action.
+        """
+        return self.getGameEnded(board, player)
+
     def getCanonicalForm(self, board, player):
         """
         Input:
@@ -88,19 +108,44 @@ class Game():
         """
         pass
 
-    def getSymmetries(self, board, pi):
+    def getSymmetries(self, board, pi, stacked=False):
         """
         Input:
             board: current board
-            pi: policy vector of size self.getActionSize()
+            pi: policy vector of size self.getActionSize(), a list or a
+                numpy array
+            stacked: games that compute their symmetries as index
+                     permutations (see utils.dihedralPermutations) return
+                     them as two stacked arrays when this is True. Other
+                     games only support False.
 
         Returns:
             symmForms: a list of [(board,pi)] where each tuple is a symmetrical
                        form of the board and the corresponding pi vector. This
                        is used when training the neural network from examples.
+                       pi can come back as a numpy array even if a list was
+                       passed, so callers should not rely on getting lists.
+                       With stacked=True, the tuple (boards, pis) of the
+                       symmetrical forms stacked along a new first axis.
         """
         pass
 
+    def getRandomSymmetry(self, board, pi):
+        """
+        Input:
+            board: current board
+            pi: policy vector of size self.getActionSize()
+
+        Returns:
+            (board, pi): one of the symmetrical forms returned by
+                         getSymmetries, chosen uniformly at random. It is used
+                         to augment training examples stored without their
+                         symmetries (see args.lazySymmetries). Games can
+                         override it to transform only the chosen form.
+        """
+        symmForms = self.getSymmetries(board, pi)
+        return symmForms[np.random.randint(len(symmForms))]
+
     def stringRepresentation(self, board):
         """
         Input:
@@ -111,3 +156,20 @@ class Game():
                          Required by MCTS for hashing.
         """
         pass
+
+    def hashState(self, board):
+        """
+        Optional fast path for stringRepresentation.
+
+        Input:
+            board: current board
+
+        Returns:
+            key: a 64-bit integer identifying board, e.g. a Zobrist hash kept
+                 up to date by getNextState, or None if the game does not
+                 implement it. When available, MCTS uses this key instead of
+                 stringRepresentation. Two boards must get the same key exactly
+                 when they get the same stringRepresentation (up to hash
+                 collisions).
+        """
+        return None
@@ -0,0 +1,205 @@
+import logging
+import multiprocessing
+import queue
+import time
+import traceback
+
+import numpy as np
+
+from NeuralNet import NeuralNet
+
+log = logging.getLogger(__name__)
+
+
+class InferenceServer():
+    """
+    A process that owns one copy of the neural network and evaluates the
+    predict requests of many clients (e.g. the MCTS of every self-play worker)
+    in dynamic batches.
+
+    A batch is started by the first pending request. It is then filled with
+    the requests arriving within maxWait seconds, up to maxBatchSize boards,
+    and sent to the network with one call to predict_batch. A request that
+    would overflow the batch waits for the next one, and a single request of
+    more than maxBatchSize boards is split over several calls. Since a client
+    waits for its answer, a batch never holds more than one request per
+    client, and it is closed early once every client is waiting.
+
+    If the network fails to load or to predict, the error is sent back to
+    the clients waiting on the batch and to every later request, where
+    predict raises it as an InferenceServerError.
+
+    Clients are obtained with getClient and implement the NeuralNet
+    interface, so MCTS uses them like any other network.
+    """
+
+    def __init__(self, game, nnetClass, folder, filename, numClients, maxBatchSize=64, maxWait=0.002):
+        """
+        Input:
+            game: Game object
+            nnetClass: the NeuralNet subclass to evaluate, built in the server
+                       process with nnetClass(game)
+            folder, filename: the checkpoint the network is loaded from
+            numClients: number of clients that will be handed out
+            maxBatchSize: maximum number of boards per call to predict_batch
+            maxWait: maximum number of seconds a batch waits for more requests
+        """
+        self.numClients = numClients
+        self.requests = multiprocessing.Queue()
+        self.responses = [multiprocessing.Queue() for _ in range(numClients)]
+        self.statsQueue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=serve,
+            args=(game, nnetClass, folder, filename, self.requests, self.responses, self.statsQueue,
+                  maxBatchSize, maxWait),
+            daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self.process.start()
+
+    def stop(self):
+        """
+        Shuts the server down after the pending requests are answered.
+
+        Returns:
+            stats: a dict with the number of batches and boards evaluated, the
+                   mean and max batch size, the mean and max time (in
+                   seconds) requests spent queued before their batch started,
+                   and the error the server failed with, if any
+        """
+        self.requests.put(None)
+        while True:
+            try:
+                stats = self.statsQueue.get(timeout=1)
+                break
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise InferenceServerError('the inference server process died with exit code %s'
+                                               % self.process.exitcode)
+        self.process.join()
+        if stats['error'] is not None:
+            log.error('Inference server failed: %s', stats['error'])
+        log.info('Inference server: %d boards in %d batches (mean size %.1f, max %d), '
+                 'queue latency mean %.2f ms, max %.2f ms',
+                 stats['boards'], stats['batches'], stats['meanBatchSize'], stats['maxBatchSize'],
+                 1000 * stats['meanLatency'], 1000 * stats['maxLatency'])
+        return stats
+
+    def getClient(self, clientId):
+        """
+        Returns:
+            client: an InferenceClient answered through response queue
+                    clientId, which must be in [0, numClients) and handed to
+                    a single process
+        """
+        return InferenceClient(self.requests, self.responses[clientId], clientId)
+
+
+class InferenceClient(NeuralNet):
+    """
+    A NeuralNet whose predictions are computed by an InferenceServer. It can
+    be pickled and sent to the process that uses it. Training and checkpoints
+    are not supported, they belong to the network the server was built from.
+    """
+
+    def __init__(self, requests, responses, clientId):
+        self.requests = requests
+        self.responses = responses
+        self.clientId = clientId
+
+    def predict(self, board):
+        pis, vs = self.predict_batch([board])
+        return pis[0], vs[0]
+
+    def predict_batch(self, boards):
+        self.requests.put((self.clientId, time.time(), list(boards)))
+        response = self.responses.get()
+        if isinstance(response, InferenceServerError):
+            raise response
+        return response
+
+
+class InferenceServerError(RuntimeError):
+    """An error of the InferenceServer, raised by the clients it was answering."""
+
+
+def serve(game, nnetClass, folder, filename, requests, responses, statsQueue, maxBatchSize, maxWait):
+    """
+    The main loop of the InferenceServer process. Stops on a None request and
+    puts its statistics on statsQueue.
+    """
+    batchSizes = []
+    latencies = []
+    error = None
+    try:
+        nnet = nnetClass(game)
+        nnet.load_checkpoint(folder=folder, filename=filename)
+    except Exception:
+        error = InferenceServerError(traceback.format_exc())
+
+    pending = None  # a request left over from the last batch, which it would have overflowed
+    stopping = False
+    while not stopping:
+        request = pending if pending is not None else requests.get()
+        pending = None
+        if request is None:
+            break
+        batch = [request]
+        numBoards = len(request[2])
+        deadline = time.time() + maxWait
+        while len(batch) < len(responses) and numBoards < maxBatchSize:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                request = requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                stopping = True
+                break
+            if numBoards + len(request[2]) > maxBatchSize:
+                pending = request
+                break
+            batch.append(request)
+            numBoards += len(request[2])
+
+        start = time.time()
+        latencies.extend(start - requestTime for _, requestTime, _ in batch)
+        if error is None:
+            try:
+                boards = [board for _, _, boards in batch for board in boards]
+                pis, vs = [], []
+                for i in range(0, len(boards), maxBatchSize):
+                    batchPis, batchVs = nnet.predict_batch(boards[i:i + maxBatchSize])
+                    pis.extend(batchPis)
+                    vs.extend(batchVs)
+                    batchSizes.append(len(boards[i:i + maxBatchSize]))
+            except Exception:
+                error = InferenceServerError(traceback.format_exc())
+        if error is not None:
+            for clientId, _, _ in batch:
+                responses[clientId].put(error)
+            continue
+
+        i = 0
+        for clientId, _, boards in batch:
+            responses[clientId].put((np.array(pis[i:i + len(boards)]), np.array(vs[i:i + len(boards)])))
+            i += len(boards)
+
+    statsQueue.put({
+        'batches': len(batchSizes),
+        'boards': int(np.sum(batchSizes)) if batchSizes else 0,
+        'meanBatchSize': float(np.mean(batchSizes)) if batchSizes else 0.,
+        'maxBatchSize': int(np.max(batchSizes)) if batchSizes else 0,
+        'meanLatency': float(np.mean(latencies)) if latencies else 0.,
+        'maxLatency': float(np.max(latencies)) if latencies else 0.,
+        'error': None if error is None else str(error),
+    })
@@ -4,6 +4,7 @@ import math
 import numpy as np
 
 EPS = 1e-8
+INIT_CAPACITY = 16  # number of node rows allocated before the table first grows
 
 log = logging.getLogger(__name__)
 
@@ -11,34 +12,100 @@ log = logging.getLogger(__name__)
 class MCTS():
     """
     This class handles the MCTS tree.
+
+    The tree is stored as a node table. Every expanded state s is given a
+    compact integer id (self.nodes[s]) and owns one row in each of the per-edge
+    arrays Nsa, Wsa, Qsa, Ps and Vs, so the statistics of all actions of a state
+    live in contiguous memory instead of one dict entry per (s,a) tuple.
+
+    States are identified by game.hashState when the game implements it, and
+    by game.stringRepresentation otherwise (see stateKey).
+
+    The tree is reused between moves: getActionProb makes the board it is
+    called with the root, dropping every node that cannot be reached from it.
+
+    The node table doubles as a transposition table whose size can be bounded
+    with args.maxTreeNodes and/or args.maxTreeBytes. When it is full, a new
+    node takes the row of a node evicted according to args.treeEviction:
+    'lru' (the least recently used node, default) or 'visits' (the least
+    visited node, least recently used first). Nodes used by the simulations
+    in progress are never evicted. hits, misses and evictions count the table
+    lookups and evictions.
     """
 
     def __init__(self, game, nnet, args):
         self.game = game
         self.nnet = nnet
         self.args = args
-        self.Qsa = {}  # stores Q values for s,a (as defined in the paper)
-        self.Nsa = {}  # stores #times edge s,a was visited
-        self.Ns = {}  # stores #times board s was visited
-        self.Ps = {}  # stores initial policy (returned by neural net)
+        self.actionSize = self.game.getActionSize()
+        self.numParallelLeaves = self.args.get('numParallelLeaves', 1)  # leaves evaluated per call to nnet.predict_batch
+        self.virtualLoss = self.args.get('virtualLoss', 1)  # visits (each counted as a loss) added to edges being searched
+        self.eviction = self.args.get('treeEviction', 'lru')
+        self.maxNodes = self.args.get('maxTreeNodes')  # None for an unbounded tree
+        if self.args.get('maxTreeBytes') is not None:
+            nodeBytes = 2 * 8 + (4 * 8 + 1) * self.actionSize  # one row of each table
+            maxNodes = max(self.args.maxTreeBytes // nodeBytes, 1)
+            self.maxNodes = maxNodes if self.maxNodes is None else min(self.maxNodes, maxNodes)
+        if self.eviction not in ('lru', 'visits'):
+            raise ValueError("treeEviction must be 'lru' or 'visits', not %r" % self.eviction)
+
+        self.nodes = {}  # maps the state key of an expanded board s to its node id
+        self.Es = {}  # stores game.getGameEnded for terminal boards s
+        self.numNodes = 0  # number of rows of the node table in use
+        self.children = []  # stores {a: state key of the child} for the edges taken from each node
+        self.root = None  # state key of the board of the last call to getActionProb
+        self.keys = []  # stores the state key of each node
+        self.hashing = callable(getattr(self.game, 'hashState', None))
+
+        self.clock = 0  # counts node uses, for lastUsed
+        self.protectFrom = 0  # nodes used since this clock belong to simulations in progress and can't be evicted
+        self.hits = 0  # lookups of boards found in the table
+        self.misses = 0  # lookups of boards not found in the table
+        self.evictions = 0  # nodes evicted to make room for new ones
 
-        self.Es = {}  # stores game.getGameEnded ended for board s
-        self.Vs = {}  # stores game.getValidMoves for board s
+        self.Ns = np.zeros(0, dtype=np.int64)  # stores #times board s was visited
+        self.lastUsed = np.zeros(0, dtype=np.int64)  # stores the clock of the last use of board s
+        self.Nsa = np.zeros((0, self.actionSize), dtype=np.int64)  # stores #times edge s,a was visited
+        self.Wsa = np.zeros((0, self.actionSize))  # stores total value of edge s,a
+        self.Qsa = np.zeros((0, self.actionSize))  # stores Q values for s,a (as defined in the paper)
+        self.Ps = np.zeros((0, self.actionSize))  # stores initial policy (returned by neural net)
+        self.Vs = np.zeros((0, self.actionSize), dtype=bool)  # stores game.getValidMoves for board s
 
     def getActionProb(self, canonicalBoard, temp=1):
         """
         This function performs numMCTSSims simulations of MCTS starting from
-        canonicalBoard.
+        canonicalBoard, after making it the root of the tree (see reroot).
 
         Returns:
             probs: a policy vector where the probability of the ith action is
                    proportional to Nsa[(s,a)]**(1./temp)
         """
-        for i in range(self.args.numMCTSSims):
-            self.search(canonicalBoard)
+        s = self.stateKey(canonicalBoard)
+        self.reroot(s)
 
-        s = self.game.stringRepresentation(canonicalBoard)
-        counts = [self.Nsa[(s, a)] if (s, a) in self.Nsa else 0 for a in range(self.game.getActionSize())]
+        if self.numParallelLeaves > 1:
+            sims = 0
+            while sims < self.args.numMCTSSims:
+                self.protectFrom = self.clock + 1
+                sims += self.searchBatch(canonicalBoard, min(self.numParallelLeaves, self.args.numMCTSSims - sims))
+        else:
+            for i in range(self.args.numMCTSSims):
+                self.protectFrom = self.clock + 1
+                self.search(canonicalBoard, s)
+
+        return self.getVisitProbs(s, temp)
+
+    def getVisitProbs(self, s, temp=1):
+        """
+        Returns:
+            probs: a policy vector where the probability of the ith action is
+                   proportional to Nsa[(s,a)]**(1./temp), as returned by
+                   getActionProb for the board with state key s
+        """
+        if s in self.nodes:
+            counts = self.Nsa[self.nodes[s]].astype(np.float64)
+        else:
+            counts = np.zeros(self.actionSize)
 
         if temp == 0:
             bestAs = np.array(np.argwhere(counts == np.max(counts))).flatten()
@@ -47,12 +114,11 @@ class MCTS():
             probs[bestA] = 1
             return probs
 
-        counts = [x ** (1. / temp) for x in counts]
-        counts_sum = float(sum(counts))
-        probs = [x / counts_sum for x in counts]
-        return probs
+        counts = counts ** (1. / temp)
+        probs = counts / float(np.sum(counts))
+        return probs.tolist()
 
-    def search(self, canonicalBoard):
+    def search(self, canonicalBoard, s=None, action=None):
         """
         This function performs one iteration of MCTS. It is recursively called
         till a leaf node is found. The action chosen at each node is one that
@@ -68,70 +134,370 @@ class MCTS():
         state. This is done since v is in [-1,1] and if v is the value of a
         state for the current player, then its value is -v for the other player.
 
+        Input:
+            canonicalBoard: the board to search from
+            s: the state key of canonicalBoard, if already known
+            action: the action that led to canonicalBoard, if known
+
         Returns:
             v: the negative of the value of the current canonicalBoard
         """
 
-        s = self.game.stringRepresentation(canonicalBoard)
+        if s is None:
+            s = self.stateKey(canonicalBoard)
+        nid = self.nodes.get(s)
 
-        if s not in self.Es:
-            self.Es[s] = self.game.getGameEnded(canonicalBoard, 1)
-        if self.Es[s] != 0:
+        if nid is None:
+            if s not in self.Es:
+                self.misses += 1
+                e = self.gameEnded(canonicalBoard, action)
+                if e == 0:
+                    # leaf node
+                    ps, v = self.nnet.predict(canonicalBoard)
+                    return -self.expand(s, canonicalBoard, ps, v)
+                self.Es[s] = e
             # terminal node
+            self.hits += 1
             return -self.Es[s]
 
-        if s not in self.Ps:
-            # leaf node
-            self.Ps[s], v = self.nnet.predict(canonicalBoard)
-            valids = self.game.getValidMoves(canonicalBoard, 1)
-            self.Ps[s] = self.Ps[s] * valids  # masking invalid moves
-            sum_Ps_s = np.sum(self.Ps[s])
-            if sum_Ps_s > 0:
-                self.Ps[s] /= sum_Ps_s  # renormalize
-            else:
-                # if all valid moves were masked make all valid moves equally probable
+        self.hits += 1
+        self.touch(nid)
+
+        # pick the action with the highest upper confidence bound
+        a = self.selectAction(nid)
+        if a == -1:
+            # every action of s was already taken once (see below), back up the mean value of s instead
+            return -self.meanValue(nid)
 
-                # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
-                # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.   
-                log.error("All valid moves were masked, doing a workaround.")
-                self.Ps[s] = self.Ps[s] + valids
-                self.Ps[s] /= np.sum(self.Ps[s])
+        self.Vs[nid, a] = False  # To avoid infinite loops if we ever end up back at s we are not allowed to take the same action.
+        next_s, next_player = self.game.getNextState(canonicalBoard, 1, a)
+        next_s = self.game.getCanonicalForm(next_s, next_player)
+        child = self.stateKey(next_s)
+        self.children[nid][a] = child
 
-            self.Vs[s] = valids
-            self.Ns[s] = 0
-            return -v
+        v = self.search(next_s, child, a)
 
-        valids = self.Vs[s]
-        cur_best = -float('inf')
-        best_act = -1
+        self.Nsa[nid, a] += 1
+        self.Wsa[nid, a] += v
+        self.Qsa[nid, a] = self.Wsa[nid, a] / self.Nsa[nid, a]
+        self.Ns[nid] += 1
+        return -v
 
-        # pick the action with the highest upper confidence bound
-        for a in range(self.game.getActionSize()):
-            if valids[a]:
-                if (s, a) in self.Qsa:
-                    u = self.Qsa[(s, a)] + self.args.cpuct * self.Ps[s][a] * math.sqrt(self.Ns[s]) / (
-                            1 + self.Nsa[(s, a)])
+    def gameEnded(self, board, action):
+        """
+        Returns:
+            e: game.getGameEnded(board, 1), computed by the faster
+               game.getGameEndedAfterMove when action, the action that led to
+               board, is known
+        """
+        if action is None:
+            return self.game.getGameEnded(board, 1)
+        return self.game.getGameEndedAfterMove(board, 1, action)
+
+    def stateKey(self, board):
+        """
+        Returns:
+            key: game.hashState(board), a 64-bit integer, if the game
+                 implements it for board, else game.stringRepresentation(board)
+        """
+        if self.hashing:
+            key = self.game.hashState(board)
+            if key is not None:
+                return key
+        return self.game.stringRepresentation(board)
+
+    def selectAction(self, nid):
+        """
+        Computes the upper confidence bound of every valid action of node nid
+        in one vectorized expression.
+
+        Returns:
+            a: the valid action with the highest upper confidence bound (the
+               lowest such action on ties), -1 if node nid has no valid action
+        """
+        valids = np.flatnonzero(self.Vs[nid])
+        if len(valids) == 0:
+            return -1
+        Nsa = self.Nsa[nid, valids]
+        Ps = self.Ps[nid, valids]
+        u = np.where(Nsa > 0,
+                     self.Qsa[nid, valids] + self.args.cpuct * Ps * math.sqrt(self.Ns[nid]) / (1 + Nsa),
+                     self.args.cpuct * Ps * math.sqrt(self.Ns[nid] + EPS))  # Q = 0 ?
+        return int(valids[np.argmax(u)])
+
+    def searchBatch(self, canonicalBoard, k):
+        """
+        Performs up to k simulations of MCTS starting from canonicalBoard. The
+        leaves they reach are evaluated together with one call to
+        nnet.predict_batch and then backed up.
+
+        Returns:
+            sims: the number of simulations performed, at least 1
+        """
+        leaves, sims = self.gatherLeaves(canonicalBoard, k)
+        if leaves:
+            pis, vs = self.nnet.predict_batch([board for _, board, _ in leaves])
+            self.expandLeaves(leaves, pis, vs)
+        return sims
+
+    def gatherLeaves(self, canonicalBoard, k):
+        """
+        Descends the tree from canonicalBoard up to k times. Every edge taken
+        gets a virtual loss, so that the next descents of the batch spread over
+        other branches. Descents ending in a terminal board (or a node without
+        actions left) are backed up right away. Descents ending in a new leaf
+        stay under virtual loss until expandLeaves is called.
+
+        A descent reaching a leaf that is already pending in this batch is
+        undone and ends the batch early.
+
+        Returns:
+            leaves: a list of (s, board, path) for the leaves to be evaluated
+                    by the neural network
+            sims: the number of simulations performed
+        """
+        leaves = []
+        pending = set()
+        sims = 0
+        while sims < k:
+            s, board, path, v = self.descend(canonicalBoard)
+            if v is not None:
+                self.backup(path, v)
+            elif s in pending:
+                self.undoDescent(path)
+                break
+            else:
+                pending.add(s)
+                leaves.append((s, board, path))
+            sims += 1
+        return leaves, sims
+
+    def expandLeaves(self, leaves, pis, vs):
+        """
+        Expands the leaves returned by gatherLeaves with the policies pis and
+        values vs predicted for them and backs the values up.
+        """
+        for (s, board, path), ps, v in zip(leaves, pis, vs):
+            self.backup(path, self.expand(s, board, ps, v))
+
+    def descend(self, canonicalBoard):
+        """
+        Walks down the tree from canonicalBoard, taking the action with the
+        highest upper confidence bound at every node and applying a virtual
+        loss to it.
+
+        Returns:
+            s: the state key of the board the descent stopped at
+            board: that board
+            path: the list of (nid, a) edges taken
+            v: the value of board for the player to move, None if board is a
+               new leaf that has to be evaluated by the neural network
+        """
+        path = []
+        board = canonicalBoard
+        s = self.stateKey(board)
+        a = None
+        while True:
+            nid = self.nodes.get(s)
+            if nid is None:
+                if s not in self.Es:
+                    self.misses += 1
+                    e = self.gameEnded(board, a)
+                    if e == 0:
+                        return s, board, path, None
+                    self.Es[s] = e
                 else:
-                    u = self.args.cpuct * self.Ps[s][a] * math.sqrt(self.Ns[s] + EPS)  # Q = 0 ?
+                    self.hits += 1
+                return s, board, path, self.Es[s]
+            self.hits += 1
+            self.touch(nid)
 
-                if u > cur_best:
-                    cur_best = u
-                    best_act = a
+            a = self.selectAction(nid)
+            if a == -1:
+                return s, board, path, self.meanValue(nid)
 
-        a = best_act
-        self.Vs[s][a] = 0 # To avoid infinite loops if we ever end up back at s we are not allowed to take the same action. 
-        next_s, next_player = self.game.getNextState(canonicalBoard, 1, a)
-        next_s = self.game.getCanonicalForm(next_s, next_player)
+            self.Vs[nid, a] = False  # see search()
+            self.Nsa[nid, a] += self.virtualLoss
+            self.Wsa[nid, a] -= self.virtualLoss
+            self.Qsa[nid, a] = self.Wsa[nid, a] / self.Nsa[nid, a] if self.Nsa[nid, a] > 0 else 0
+            self.Ns[nid] += self.virtualLoss
+            path.append((nid, a))
+
+            board, next_player = self.game.getNextState(board, 1, a)
+            board = self.game.getCanonicalForm(board, next_player)
+            s = self.stateKey(board)
+            self.children[nid][a] = s
+
+    def backup(self, path, v):
+        """
+        Propagates the value v of the board reached by path up the path and
+        removes the virtual loss descend applied to its edges.
+        """
+        for nid, a in reversed(path):
+            v = -v
+            self.Nsa[nid, a] += 1 - self.virtualLoss
+            self.Wsa[nid, a] += v + self.virtualLoss
+            self.Qsa[nid, a] = self.Wsa[nid, a] / self.Nsa[nid, a]
+            self.Ns[nid] += 1 - self.virtualLoss
+
+    def undoDescent(self, path):
+        """
+        Reverts the virtual loss and the action masking descend applied to
+        the edges of path.
+        """
+        for nid, a in path:
+            self.Vs[nid, a] = True
+            self.Nsa[nid, a] -= self.virtualLoss
+            self.Wsa[nid, a] += self.virtualLoss
+            self.Qsa[nid, a] = self.Wsa[nid, a] / self.Nsa[nid, a] if self.Nsa[nid, a] > 0 else 0
+            self.Ns[nid] -= self.virtualLoss
+
+    def expand(self, s, canonicalBoard, ps, v):
+        """
+        Stores the policy ps predicted for the leaf canonicalBoard, masked to
+        its valid moves and renormalized, in a new row of the node table.
+
+        Returns:
+            v: the value of canonicalBoard for the current player
+        """
+        valids = self.game.getValidMoves(canonicalBoard, 1)
+        ps = ps * valids  # masking invalid moves
+        sum_Ps_s = np.sum(ps)
+        if sum_Ps_s > 0:
+            ps /= sum_Ps_s  # renormalize
+        else:
+            # if all valid moves were masked make all valid moves equally probable
+
+            # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
+            # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.
+            log.error("All valid moves were masked, doing a workaround.")
+            ps = ps + valids
+            ps /= np.sum(ps)
+
+        nid = self.newNode(s)
+        self.Ps[nid] = ps
+        self.Vs[nid] = valids
+        return np.asarray(v).item()
 
-        v = self.search(next_s)
+    def newNode(self, s):
+        """
+        Allocates a zeroed row of the node table for board s, evicting a node
+        if the table is full.
+
+        Returns:
+            nid: the node id of s
+        """
+        nid = None
+        if self.maxNodes is not None and self.numNodes >= self.maxNodes:
+            nid = self.evict()
+        if nid is None:
+            if self.numNodes == len(self.Ns):
+                self.grow()
+            nid = self.numNodes
+            self.numNodes += 1
+            self.keys.append(s)
+            self.children.append({})
+        else:
+            self.keys[nid] = s
+            self.children[nid] = {}
+        self.nodes[s] = nid
+        self.touch(nid)
+        return nid
+
+    def touch(self, nid):
+        self.clock += 1
+        self.lastUsed[nid] = self.clock
 
-        if (s, a) in self.Qsa:
-            self.Qsa[(s, a)] = (self.Nsa[(s, a)] * self.Qsa[(s, a)] + v) / (self.Nsa[(s, a)] + 1)
-            self.Nsa[(s, a)] += 1
+    def evict(self):
+        """
+        Removes the node chosen by the eviction policy from the table and
+        zeroes its row.
 
+        Returns:
+            nid: the id of the freed row, None if every node is in use by the
+                 simulations in progress (the table then grows past its cap)
+        """
+        lastUsed = self.lastUsed[:self.numNodes]
+        evictable = lastUsed < self.protectFrom
+        if not np.any(evictable):
+            log.warning('No MCTS node can be evicted, growing the tree past %d nodes.', self.maxNodes)
+            return None
+        if self.eviction == 'visits':
+            priority = self.Ns[:self.numNodes] * (self.clock + 1) + lastUsed
         else:
-            self.Qsa[(s, a)] = v
-            self.Nsa[(s, a)] = 1
+            priority = lastUsed
+        nid = int(np.argmin(np.where(evictable, priority, np.iinfo(np.int64).max)))
 
-        self.Ns[s] += 1
-        return -v
\ No newline at end of file
+        del self.nodes[self.keys[nid]]
+        for table in (self.Ns, self.lastUsed, self.Nsa, self.Wsa, self.Qsa, self.Ps, self.Vs):
+            table[nid] = 0
+        self.evictions += 1
+        return nid
+
+    def grow(self):
+        """
+        Doubles the number of rows of the node table, without going past
+        maxNodes while there is room below it.
+        """
+        capacity = max(2 * len(self.Ns), INIT_CAPACITY)
+        if self.maxNodes is not None and self.numNodes < self.maxNodes:
+            capacity = min(capacity, self.maxNodes)
+        self.resize(capacity, np.arange(self.numNodes))
+
+    def resize(self, capacity, rows):
+        """
+        Replaces the node table with one of the given capacity whose first
+        len(rows) rows are copies of the old rows and the rest are zero.
+        """
+        for name in ('Ns', 'lastUsed', 'Nsa', 'Wsa', 'Qsa', 'Ps', 'Vs'):
+            table = getattr(self, name)
+            resized = np.zeros((capacity,) + table.shape[1:], dtype=table.dtype)
+            resized[:len(rows)] = table[rows]
+            setattr(self, name, resized)
+
+    def reroot(self, s):
+        """
+        Makes the board with state key s, usually the position
+        reached after a move was played, the root of the tree. Its subtree is
+        kept with all its statistics. Every node and terminal result that
+        cannot be reached from it through the edges taken so far is dropped,
+        and the node table is compacted, so the simulations of the next move
+        only go to new nodes and memory stays bounded over long games.
+        """
+        if s == self.root:
+            return
+        self.root = s
+
+        keys = []
+        Es = {}
+        if s in self.nodes:
+            keys.append(s)
+            seen = {s}
+            for key in keys:  # keys grows while iterating, visiting the nodes breadth first
+                for child in self.children[self.nodes[key]].values():
+                    if child in seen:
+                        continue
+                    seen.add(child)
+                    if child in self.nodes:
+                        keys.append(child)
+                    elif child in self.Es:
+                        Es[child] = self.Es[child]
+
+        rows = np.array([self.nodes[key] for key in keys], dtype=np.int64)
+        capacity = max(2 * len(keys), INIT_CAPACITY)
+        if self.maxNodes is not None and len(keys) <= self.maxNodes:
+            capacity = min(capacity, self.maxNodes)
+        self.resize(capacity, rows)
+        self.children = [self.children[nid] for nid in rows]
+        self.keys = keys
+        self.nodes = {key: nid for nid, key in enumerate(keys)}
+        self.Es = Es
+        self.numNodes = len(keys)
+
+    def meanValue(self, nid):
+        """
+        Returns the mean backed up value of node nid for the player to move, 0
+        if none of its edges has been visited yet.
+        """
+        n = np.sum(self.Nsa[nid])
+        return float(np.sum(self.Wsa[nid]) / n) if n > 0 else 0.
@@ -0,0 +1,179 @@
+import bisect
+import logging
+import os
+import shutil
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+SHARD_PREFIX = 'iter_'
+COLUMNS = ('boards', 'pis', 'vs')
+
+
+class ReplayBuffer():
+    """
+    Stores the training examples of the latest iterations on disk, in one
+    shard per iteration. A shard is a directory holding the boards, pis and
+    vs of the iteration's examples as three fixed-dtype .npy arrays, so
+    examples are never pickled.
+
+    Shards are written once, when their iteration ends, and never rewritten.
+    They are numbered in the order they are written, continuing from the
+    highest shard already in the folder, so a resumed run adds its shards
+    after the ones of the runs before it. They are opened lazily as read-only
+    memory maps, so only the examples actually used are read into memory.
+    Once there are more than maxShards, the oldest ones are deleted.
+
+    Boards must convert to numeric arrays of a fixed shape with np.asarray,
+    or provide astype like the tafl Board.
+    """
+
+    def __init__(self, folder, maxShards):
+        self.folder = folder
+        self.maxShards = maxShards
+        self.shards = {}  # maps the number of an opened shard to its columns
+        os.makedirs(folder, exist_ok=True)
+
+    def iterations(self):
+        """
+        Returns:
+            iterations: the numbers of the shards on disk, oldest first
+        """
+        names = [name for name in os.listdir(self.folder) if name.startswith(SHARD_PREFIX) and
+                 os.path.isdir(os.path.join(self.folder, name))]
+        return sorted(int(name[len(SHARD_PREFIX):]) for name in names)
+
+    def nextIteration(self):
+        return max(self.iterations(), default=0) + 1
+
+    def addIteration(self, examples):
+        """
+        Writes the examples (board, pi, v) of an iteration to a new shard and
+        deletes the shards past maxShards.
+
+        Returns:
+            iteration: the number of the new shard
+        """
+        boards = np.array([toArray(board) for board, _, _ in examples])
+        pis = np.array([pi for _, pi, _ in examples], dtype=np.float32)
+        vs = np.array([v for _, _, v in examples], dtype=np.float32)
+        if boards.dtype == object:
+            raise ValueError('ReplayBuffer needs boards that convert to arrays of one shape and a numeric dtype')
+
+        iteration = self.nextIteration()
+        path = self.shardPath(iteration)
+        tmpPath = path + '.tmp'
+        shutil.rmtree(tmpPath, ignore_errors=True)
+        os.makedirs(tmpPath)
+        for name, column in zip(COLUMNS, (boards, pis, vs)):
+            np.save(os.path.join(tmpPath, name + '.npy'), column)
+        os.rename(tmpPath, path)
+        self.dropOldShards()
+        return iteration
+
+    def addShards(self, folder):
+        """
+        Copies the shards of the buffer in folder after the ones of this
+        buffer, keeping their numbers when they are higher than the shards
+        already here, and deletes the shards past maxShards.
+        """
+        other = ReplayBuffer(folder, self.maxShards)
+        for iteration in other.iterations():
+            path = self.shardPath(max(iteration, self.nextIteration()))
+            shutil.rmtree(path + '.tmp', ignore_errors=True)
+            shutil.copytree(other.shardPath(iteration), path + '.tmp')
+            os.rename(path + '.tmp', path)
+        self.dropOldShards()
+
+    def dropOldShards(self):
+        for old in self.iterations()[:-self.maxShards]:
+            log.warning(f"Removing the examples of iteration {old} from the replay buffer.")
+            self.shards.pop(old, None)
+            shutil.rmtree(self.shardPath(old))
+
+    def shardPath(self, iteration):
+        return os.path.join(self.folder, SHARD_PREFIX + '%06d' % iteration)
+
+    def shard(self, iteration):
+        """
+        Returns:
+            (boards, pis, vs): the columns of the shard of iteration, memory
+                               mapped from disk
+        """
+        if iteration not in self.shards:
+            path = self.shardPath(iteration)
+            self.shards[iteration] = tuple(np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+                                           for name in COLUMNS)
+        return self.shards[iteration]
+
+    def examples(self):
+        """
+        Returns:
+            examples: a ReplayExamples sequence of all the examples currently
+                      in the buffer, oldest iteration first
+        """
+        return ReplayExamples([self.shard(iteration) for iteration in self.iterations()])
+
+    def __len__(self):
+        return len(self.examples())
+
+
+class ReplayExamples():
+    """
+    A read-only sequence of (board, pi, v) examples over the columns of some
+    shards, usable wherever NNet.train expects a list of examples.
+    """
+
+    def __init__(self, shards):
+        self.shards = shards
+        self.offsets = [0]  # index of the first example of each shard, and the total
+        for boards, _, _ in shards:
+            self.offsets.append(self.offsets[-1] + len(boards))
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('example index out of range')
+        k = bisect.bisect_right(self.offsets, i) - 1
+        boards, pis, vs = self.shards[k]
+        j = i - self.offsets[k]
+        return np.array(boards[j]), np.array(pis[j]), float(vs[j])
+
+    def __iter__(self):
+        for boards, pis, vs in self.shards:
+            for j in range(len(boards)):
+                yield np.array(boards[j]), np.array(pis[j]), float(vs[j])
+
+    def columns(self, ids):
+        """
+        Returns:
+            (boards, pis, vs): the examples with indices ids as three stacked
+                               arrays, read with one fancy index per shard
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        shardOf = np.searchsorted(self.offsets, ids, side='right') - 1
+        columns = [None, None, None]
+        for k in np.unique(shardOf):
+            mask = shardOf == k
+            local = ids[mask] - self.offsets[k]
+            for c, column in enumerate(self.shards[k]):
+                if columns[c] is None:
+                    columns[c] = np.empty((len(ids),) + column.shape[1:], dtype=column.dtype)
+                columns[c][mask] = column[local]
+        return tuple(columns)
+
+
+def toArray(board):
+    """
+    Returns:
+        board as a numpy array, through board.astype for boards that are
+        objects (like the tafl Board) rather than arrays
+    """
+    if not isinstance(board, np.ndarray) and hasattr(board, 'astype'):
+        return board.astype(np.float32)
+    return np.asarray(board)
@@ -0,0 +1,127 @@
+import numpy as np
+
+from MCTS import MCTS
+
+
+class Episode():
+    """
+    The state of one self-play game of VectorizedSelfPlay, with its own MCTS
+    tree.
+    """
+
+    def __init__(self, game, mcts):
+        self.mcts = mcts
+        self.board = game.getInitBoard()
+        self.curPlayer = 1
+        self.episodeStep = 0
+        self.trainExamples = []
+        self.canonicalBoard = None  # the board being searched, for the player to move
+        self.s = None  # its state key
+        self.sims = 0  # simulations done for the current move
+
+
+class VectorizedSelfPlay():
+    """
+    Plays self-play episodes in lockstep in a single process: args.numLockstepGames
+    games advance one move at a time together, and the MCTS leaves of all of
+    them (args.numParallelLeaves per game) are evaluated with one call to
+    nnet.predict_batch. This keeps the network busy with large batches without
+    any multiprocessing.
+
+    Each game follows Coach.executeEpisode and produces examples of the same
+    form. As soon as a game ends a new one takes its place, until numEps games
+    have been played.
+    """
+
+    def __init__(self, game, nnet, args):
+        self.game = game
+        self.nnet = nnet
+        self.args = args
+        self.numGames = self.args.get('numLockstepGames', 1)
+        self.numParallelLeaves = self.args.get('numParallelLeaves', 1)
+
+    def playEpisodes(self, numEps):
+        """
+        Plays numEps episodes, at most numGames at a time.
+
+        Yields:
+            trainExamples: the examples of every episode as returned by
+                           Coach.executeEpisode, in the order the episodes end
+        """
+        episodes = []
+        started = 0
+        while episodes or started < numEps:
+            while len(episodes) < self.numGames and started < numEps:
+                episodes.append(Episode(self.game, MCTS(self.game, self.nnet, self.args)))
+                started += 1
+
+            self.search(episodes)
+
+            playing = []
+            for episode in episodes:
+                trainExamples = self.play(episode)
+                if trainExamples is None:
+                    playing.append(episode)
+                else:
+                    yield trainExamples
+            episodes = playing
+
+    def search(self, episodes):
+        """
+        Runs the numMCTSSims simulations of the current move of every episode,
+        evaluating the leaves of all episodes together.
+        """
+        for episode in episodes:
+            episode.episodeStep += 1
+            episode.canonicalBoard = self.game.getCanonicalForm(episode.board, episode.curPlayer)
+            episode.s = episode.mcts.stateKey(episode.canonicalBoard)
+            episode.mcts.reroot(episode.s)
+            episode.sims = 0
+
+        searching = episodes
+        while searching:
+            batch = []
+            for episode in searching:
+                mcts = episode.mcts
+                mcts.protectFrom = mcts.clock + 1
+                leaves, sims = mcts.gatherLeaves(episode.canonicalBoard,
+                                                 min(self.numParallelLeaves, self.args.numMCTSSims - episode.sims))
+                episode.sims += sims
+                batch.append((episode, leaves))
+
+            boards = [board for _, leaves in batch for _, board, _ in leaves]
+            if boards:
+                pis, vs = self.nnet.predict_batch(boards)
+                i = 0
+                for episode, leaves in batch:
+                    episode.mcts.expandLeaves(leaves, pis[i:i + len(leaves)], vs[i:i + len(leaves)])
+                    i += len(leaves)
+
+            searching = [episode for episode in searching if episode.sims < self.args.numMCTSSims]
+
+    def play(self, episode):
+        """
+        Records the examples of the move just searched in episode and plays it.
+
+        Returns:
+            trainExamples: the examples of the episode as returned by
+                           Coach.executeEpisode if the move ended it, else None
+        """
+        temp = int(episode.episodeStep < self.args.tempThreshold)
+
+        pi = episode.mcts.getVisitProbs(episode.s, temp=temp)
+        if self.args.get('lazySymmetries'):
+            sym = [(episode.canonicalBoard, pi)]  # see Coach.executeEpisode
+        else:
+            sym = self.game.getSymmetries(episode.canonicalBoard, pi)
+        for b, p in sym:
+            episode.trainExamples.append([b, episode.curPlayer, p, None])
+
+        action = np.random.choice(len(pi), p=pi)
+        episode.board, episode.curPlayer = self.game.getNextState(episode.board, episode.curPlayer, action)
+
+        r = self.game.getGameEndedAfterMove(episode.board, episode.curPlayer, action)
+
+        if r != 0:
+            return [(x[0], x[2], r * ((-1) ** (x[1] != episode.curPlayer))) for x in episode.trainExamples]
+        return None
@@ -36,7 +36,15 @@ class Connect4Game(Game):
 
     def getGameEnded(self, board, player):
         b = self._base_board.with_np_pieces(np_pieces=board)
-        winstate = b.get_win_state()
+        return self._getGameEndedFromWinState(b.get_win_state(), player)
+
+    def getGameEndedAfterMove(self, board, player, action):
+        "Only checks the lines through the stone dropped in column action"
+        b = self._base_board.with_np_pieces(np_pieces=board)
+        return self._getGameEndedFromWinState(b.get_win_state_after_move(action), player)
+
+    @staticmethod
+    def _getGameEndedFromWinState(winstate, player):
         if winstate.is_ended:
             if winstate.winner is None:
                 # draw has very little value.
@@ -53,12 +53,38 @@ class Board():
         # Game is not ended yet.
         return WinState(False, None)
 
+    def get_win_state_after_move(self, column):
+        """Same as get_win_state, but only checks the lines through the top stone of column,
+        which must be the last stone played."""
+        row = np.argmax(self.np_pieces[:, column] != 0)
+        player = self.np_pieces[row][column]
+        for d_row, d_column in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            if self._run_length(row, column, d_row, d_column, player) >= self.win_length:
+                return WinState(True, player)
+
+        # draw has very little value.
+        if not self.get_valid_moves().any():
+            return WinState(True, None)
+
+        # Game is not ended yet.
+        return WinState(False, None)
+
     def with_np_pieces(self, np_pieces):
         """Create copy of board with specified pieces."""
         if np_pieces is None:
             np_pieces = self.np_pieces
         return Board(self.height, self.width, self.win_length, np_pieces)
 
+    def _run_length(self, row, column, d_row, d_column, player):
+        """Counts the stones of player in a row through (row, column) along (d_row, d_column)."""
+        length = 1
+        for sign in [1, -1]:
+            r, c = row + sign * d_row, column + sign * d_column
+            while 0 <= r < self.height and 0 <= c < self.width and self.np_pieces[r][c] == player:
+                length += 1
+                r, c = r + sign * d_row, c + sign * d_column
+        return length
+
     def _is_diagonal_winner(self, player_pieces):
         """Checks if player_pieces contains a diagonal win."""
         win_length = self.win_length
@@ -2,7 +2,7 @@ import numpy as np
 import sys
 import os
 sys.path.append('..')
-from utils import dotdict
+from utils import dotdict, trainingEpochs
 from NeuralNet import NeuralNet
 
 from .DotsAndBoxesNNet import DotsAndBoxesNNet as onnet
@@ -44,14 +44,15 @@ class NNetWrapper(NeuralNet):
         """
         examples: list of examples, each example is of form (board, pi, v)
         """
-        input_boards, target_pis, target_vs = list(zip(*examples))
-        input_boards = np.asarray(input_boards)
+        for epochExamples, epochs in trainingEpochs(examples, args.epochs):
+            input_boards, target_pis, target_vs = list(zip(*epochExamples))
+            input_boards = np.asarray(input_boards)
 
-        normalize_score(input_boards)
+            normalize_score(input_boards)
 
-        target_pis = np.asarray(target_pis)
-        target_vs = np.asarray(target_vs)
-        self.nnet.model.fit(x=input_boards, y=[target_pis, target_vs], batch_size=args.batch_size, epochs=args.epochs)
+            target_pis = np.asarray(target_pis)
+            target_vs = np.asarray(target_vs)
+            self.nnet.model.fit(x=input_boards, y=[target_pis, target_vs], batch_size=args.batch_size, epochs=epochs)
 
     def predict(self, board):
         """
@@ -2,14 +2,22 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from utils import dihedralPermutations
 from .GobangLogic import Board
 import numpy as np
 
 
 class GobangGame(Game):
-    def __init__(self, n=15, nir=5):
+    def __init__(self, n=15, nir=5, neighborhood=None):
         self.n = n
         self.n_in_row = nir
+        # if set, only the empty squares within this distance of a stone are valid moves
+        if neighborhood is not None and neighborhood < 1:
+            raise ValueError("neighborhood must be at least 1, not %r" % neighborhood)
+        self.neighborhood = neighborhood
+        # getSymmetries applies these to the flattened board and pi, the pass action stays in place
+        self.boardPerms = dihedralPermutations(n)
+        self.actionPerms = np.append(self.boardPerms, np.full((8, 1), n * n), axis=1)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -30,7 +38,7 @@ class GobangGame(Game):
         if action == self.n * self.n:
             return (board, -player)
         b = Board(self.n)
-        b.pieces = np.copy(board)
+        b.pieces = np.array(board)
         move = (int(action / self.n), action % self.n)
         b.execute_move(move, player)
         return (b.pieces, -player)
@@ -38,63 +46,61 @@ class GobangGame(Game):
     # modified
     def getValidMoves(self, board, player):
         # return a fixed size binary vector
-        valids = [0] * self.getActionSize()
+        valids = np.zeros(self.getActionSize(), dtype=int)
         b = Board(self.n)
-        b.pieces = np.copy(board)
-        legalMoves = b.get_legal_moves(player)
-        if len(legalMoves) == 0:
+        b.pieces = np.asarray(board)
+        legalMoves = b.get_legal_moves_mask(self.neighborhood)
+        if not legalMoves.any():
             valids[-1] = 1
-            return np.array(valids)
-        for x, y in legalMoves:
-            valids[self.n * x + y] = 1
-        return np.array(valids)
+            return valids
+        valids[:-1] = legalMoves.ravel()
+        return valids
 
     # modified
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
         b = Board(self.n)
-        b.pieces = np.copy(board)
-        n = self.n_in_row
-
-        for w in range(self.n):
-            for h in range(self.n):
-                if (w in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[i][h] for i in range(w, w + n))) == 1):
-                    return board[w][h]
-                if (h in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[w][j] for j in range(h, h + n))) == 1):
-                    return board[w][h]
-                if (w in range(self.n - n + 1) and h in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[w + k][h + k] for k in range(n))) == 1):
-                    return board[w][h]
-                if (w in range(self.n - n + 1) and h in range(n - 1, self.n) and board[w][h] != 0 and
-                        len(set(board[w + l][h - l] for l in range(n))) == 1):
-                    return board[w][h]
+        b.pieces = np.asarray(board)
+        winner = b.get_winner(self.n_in_row)
+        if winner != 0:
+            return winner
         if b.has_legal_moves():
             return 0
         return 1e-4
 
+    def getGameEndedAfterMove(self, board, player, action):
+        # only checks the lines through the stone placed by action
+        if action == self.n * self.n:
+            return self.getGameEnded(board, player)
+        x, y = int(action / self.n), action % self.n
+        color = board[x][y]
+        for dx, dy in [(1, 0), (0, 1), (1, 1), (1, -1)]:
+            inRow = 1
+            for sign in [1, -1]:
+                i, j = x + sign * dx, y + sign * dy
+                while 0 <= i < self.n and 0 <= j < self.n and board[i][j] == color:
+                    inRow += 1
+                    i, j = i + sign * dx, j + sign * dy
+            if inRow >= self.n_in_row:
+                return color
+        if (board == 0).any():
+            return 0
+        return 1e-4
+
     def getCanonicalForm(self, board, player):
         # return state if player==1, else return -state if player==-1
         return player * board
 
     # modified
-    def getSymmetries(self, board, pi):
+    def getSymmetries(self, board, pi, stacked=False):
         # mirror, rotational
         assert(len(pi) == self.n**2 + 1)  # 1 for pass
-        pi_board = np.reshape(pi[:-1], (self.n, self.n))
-        l = []
-
-        for i in range(1, 5):
-            for j in [True, False]:
-                newB = np.rot90(board, i)
-                newPi = np.rot90(pi_board, i)
-                if j:
-                    newB = np.fliplr(newB)
-                    newPi = np.fliplr(newPi)
-                l += [(newB, list(newPi.ravel()) + [pi[-1]])]
-        return l
+        boards = board.ravel()[self.boardPerms].reshape((8,) + board.shape)
+        pis = np.asarray(pi)[self.actionPerms]
+        if stacked:
+            return boards, pis  # all 8 symmetries as two stacked arrays
+        return list(zip(boards, pis))
 
     def stringRepresentation(self, board):
         # 8x8 numpy array (canonical board)
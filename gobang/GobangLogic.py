@@ -9,42 +9,64 @@ Board data:
      at the opposite end of the board in row 8.
 Squares are stored and manipulated as (x,y) tuples.
 x is the column, y is the row.
+The pieces are kept in an n x n numpy array.
 '''
+import numpy as np
+
+
 class Board():
     def __init__(self, n):
         "Set up initial board configuration."
         self.n = n
         # Create the empty board array.
-        self.pieces = [None]*self.n
-        for i in range(self.n):
-            self.pieces[i] = [0]*self.n
+        self.pieces = np.zeros((self.n, self.n), dtype=int)
 
     # add [][] indexer syntax to the Board
     def __getitem__(self, index): 
         return self.pieces[index]
 
-    def get_legal_moves(self, color):
+    def get_legal_moves(self, color, neighborhood=None):
         """Returns all the legal moves for the given color.
         (1 for white, -1 for black
         """
-        moves = set()  # stores the legal moves.
+        return [tuple(move) for move in np.argwhere(self.get_legal_moves_mask(neighborhood))]
 
-        # Get all empty locations.
-        for y in range(self.n):
-            for x in range(self.n):
-                if self[x][y] == 0:
-                    moves.add((x, y))
-        return list(moves)
+    def get_legal_moves_mask(self, neighborhood=None):
+        """Returns the n x n boolean array of the legal moves: the empty squares,
+        or with neighborhood=k only those within k squares (in any direction)
+        of a stone, as long as there is a stone on the board.
+        """
+        empty = self.pieces == 0
+        if neighborhood is None or empty.all():
+            return empty
+        near = ~empty
+        for _ in range(neighborhood):
+            # grow the stones by one square in the 8 directions
+            grown = near.copy()
+            grown[1:, :] |= near[:-1, :]
+            grown[:-1, :] |= near[1:, :]
+            grown[:, 1:] |= grown[:, :-1].copy()
+            grown[:, :-1] |= grown[:, 1:].copy()
+            near = grown
+        return empty & near
 
     def has_legal_moves(self):
         """Returns True if has legal move else False
         """
         # Get all empty locations.
-        for y in range(self.n):
-            for x in range(self.n):
-                if self[x][y] == 0:
-                    return True
-        return False
+        return bool((self.pieces == 0).any())
+
+    def get_winner(self, n_in_row):
+        """Returns the color with n_in_row stones in a row, column or
+        diagonal, 0 if there is none.
+        """
+        for color in [1, -1]:
+            stones = self.pieces == color
+            # diagonals going down-right on the board and on its mirror image
+            for lines, dx, dy in [(stones, 1, 0), (stones, 0, 1), (stones, 1, 1), (stones[:, ::-1], 1, 1)]:
+                if _in_row(lines, n_in_row, dx, dy).any():
+                    return color
+        return 0
 
     def execute_move(self, move, color):
         """Perform the given move on the board; flips pieces as necessary.
@@ -54,3 +76,16 @@ class Board():
         assert self[x][y] == 0
         self[x][y] = color
 
+
+def _in_row(stones, n_in_row, dx, dy):
+    """Returns the boolean array of the squares (x,y) starting n_in_row
+    stones in a row along (dx,dy), with dx and dy 0 or 1.
+    """
+    rows = stones.shape[0] - (n_in_row - 1) * dx
+    cols = stones.shape[1] - (n_in_row - 1) * dy
+    if rows <= 0 or cols <= 0:
+        return np.zeros(0, dtype=bool)
+    run = stones[:rows, :cols].copy()
+    for i in range(1, n_in_row):
+        run &= stones[i * dx:i * dx + rows, i * dy:i * dy + cols]
+    return run
@@ -0,0 +1,77 @@
+"""
+To run tests:
+pytest-3 gobang
+"""
+
+import numpy as np
+import pytest
+
+from .GobangGame import GobangGame
+
+
+def reference_game_ended(game, board):
+    # the square by square scan GobangGame.getGameEnded used to do
+    n = game.n_in_row
+    for w in range(game.n):
+        for h in range(game.n):
+            if (w in range(game.n - n + 1) and board[w][h] != 0 and
+                    len(set(board[i][h] for i in range(w, w + n))) == 1):
+                return board[w][h]
+            if (h in range(game.n - n + 1) and board[w][h] != 0 and
+                    len(set(board[w][j] for j in range(h, h + n))) == 1):
+                return board[w][h]
+            if (w in range(game.n - n + 1) and h in range(game.n - n + 1) and board[w][h] != 0 and
+                    len(set(board[w + k][h + k] for k in range(n))) == 1):
+                return board[w][h]
+            if (w in range(game.n - n + 1) and h in range(n - 1, game.n) and board[w][h] != 0 and
+                    len(set(board[w + l][h - l] for l in range(n))) == 1):
+                return board[w][h]
+    if (board == 0).any():
+        return 0
+    return 1e-4
+
+
+def reference_neighborhood(board, k):
+    n = len(board)
+    stones = np.argwhere(board != 0)
+    valids = np.zeros(n * n + 1, dtype=int)
+    for x in range(n):
+        for y in range(n):
+            if board[x][y] == 0 and (len(stones) == 0 or np.abs(stones - (x, y)).max(axis=1).min() <= k):
+                valids[n * x + y] = 1
+    if not valids.any():
+        valids[-1] = 1
+    return valids
+
+
+def test_game_ended_matches_reference():
+    rng = np.random.RandomState(0)
+    for n, nir in ((5, 5), (7, 4), (9, 5)):
+        game = GobangGame(n, nir)
+        for _ in range(20):
+            board, player = game.getInitBoard(), 1
+            while True:
+                ended = game.getGameEnded(board, player)
+                assert ended == reference_game_ended(game, board)
+                if ended != 0:
+                    break
+                action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+                board, player = game.getNextState(board, player, action)
+
+
+def test_neighborhood_moves():
+    rng = np.random.RandomState(1)
+    for k in (1, 2):
+        game = GobangGame(9, 5, neighborhood=k)
+        board, player = game.getInitBoard(), 1
+        assert list(game.getValidMoves(board, player)) == [1] * 81 + [0]
+        while game.getGameEnded(board, player) == 0:
+            valids = game.getValidMoves(board, player)
+            assert list(valids) == list(reference_neighborhood(board, k))
+            board, player = game.getNextState(board, player, rng.choice(np.flatnonzero(valids)))
+
+
+def test_neighborhood_must_be_positive():
+    for k in (0, -1):
+        with pytest.raises(ValueError):
+            GobangGame(9, 5, neighborhood=k)
@@ -26,11 +26,28 @@ args = dotdict({
     'numMCTSSims': 25,          # Number of games moves for MCTS to simulate.
     'arenaCompare': 40,         # Number of games to play during arena play to determine if new net will be accepted.
     'cpuct': 1,
+    'numParallelLeaves': 1,     # Leaves per batched network call in MCTS (self-play and arena). 1 evaluates leaves one at a time.
+    'maxTreeNodes': None,       # Maximum number of nodes of an MCTS tree, None for no limit.
+    'maxTreeBytes': None,       # Maximum size in bytes of the arrays of an MCTS tree, None for no limit.
+    'treeEviction': 'lru',      # Node evicted from a full MCTS tree: 'lru' (least recently used) or 'visits' (least visited).
+    'evalCacheSize': None,      # Number of network evaluations cached across searches and games, None for no cache.
+    'evalCacheSymmetries': False,   # Also look up the symmetric boards of a board missing from the evaluation cache.
 
     'checkpoint': './temp/',
     'load_model': False,
     'load_folder_file': ('/dev/models/8x100x50','best.pth.tar'),
     'numItersForTrainExamplesHistory': 20,
+    'incrementalExamples': False,   # Save only the new examples of each iteration, plus a manifest of the history.
+    'lazySymmetries': False,    # Store examples without their symmetries, a random one is applied when training samples them.
+    'replayBuffer': False,      # Keep the examples in per-iteration .npy shards under checkpoint/replay instead of pickles.
+
+    'numSelfPlayWorkers': 1,    # Number of processes playing the self-play episodes of an iteration.
+    'seed': None,               # Seeds every self-play episode, so results don't depend on numSelfPlayWorkers.
+    'inferenceServer': False,   # Self-play workers share one network process that batches their predictions.
+    'inferenceMaxBatchSize': 64,    # Maximum number of boards the inference server evaluates at once.
+    'inferenceMaxWait': 0.002,      # Seconds the inference server waits for more requests before evaluating a batch.
+    'numLockstepGames': 1,      # Self-play episodes played together in one process, their MCTS leaves evaluated in one batch.
+    'numArenaWorkers': 1,       # Number of processes playing the arena games of an iteration.
 
 })
 
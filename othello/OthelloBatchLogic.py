@@ -0,0 +1,66 @@
+'''
+The Othello rules of OthelloLogic.Board for a stack of boards at once.
+
+Positions are (B, n, n) boolean arrays own and opp holding the pieces of the
+player to move and of its opponent on each board. Like OthelloBitboard,
+the rules shift whole boards one square in each of the 8 directions
+instead of walking square by square, and do it for the B boards with the
+same NumPy operations.
+'''
+import numpy as np
+
+# list of all 8 directions on the board, as (x,y) offsets
+DIRECTIONS = [(1,1),(1,0),(1,-1),(0,-1),(-1,-1),(-1,0),(-1,1),(0,1)]
+
+
+def shift(squares, dx, dy):
+    """
+    Returns:
+        shifted: squares moved one square by (dx,dy) on every board, so
+                 shifted[:,x,y] = squares[:,x-dx,y-dy] (False off the board)
+    """
+    n = squares.shape[1]
+    shifted = np.zeros_like(squares)
+    shifted[:, max(dx, 0):n + min(dx, 0), max(dy, 0):n + min(dy, 0)] = \
+        squares[:, max(-dx, 0):n + min(-dx, 0), max(-dy, 0):n + min(-dy, 0)]
+    return shifted
+
+
+def legalMoves(own, opp):
+    """
+    Returns:
+        moves: the (B, n, n) mask of the empty squares where the player with
+               pieces own can play, i.e. that close a line of opp pieces
+    """
+    n = own.shape[1]
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for dx, dy in DIRECTIONS:
+        line = shift(own, dx, dy) & opp
+        for _ in range(n - 3):  # a line holds at most n-2 opp pieces
+            line |= shift(line, dx, dy) & opp
+        moves |= shift(line, dx, dy) & empty
+    return moves
+
+
+def flips(own, opp, moves):
+    """
+    Returns:
+        flips: the (B, n, n) mask of the opp pieces turned on each board by
+               playing the square set in moves (at most one per board)
+    """
+    n = own.shape[1]
+    flips = np.zeros_like(own)
+    for dx, dy in DIRECTIONS:
+        line = np.zeros_like(own)
+        square = moves
+        walking = np.ones(len(own), dtype=bool)  # boards whose walk is still on opp pieces
+        for _ in range(n - 1):
+            square = shift(square, dx, dy)
+            closed = walking & (square & own).any(axis=(1, 2))
+            flips[closed] |= line[closed]
+            walking &= (square & opp).any(axis=(1, 2))
+            line[walking] |= square[walking]
+            if not walking.any():
+                break
+    return flips
@@ -0,0 +1,119 @@
+'''
+Bitboard implementation of the Othello rules of OthelloLogic.Board.
+
+A position is a pair of Python ints (own, opp) holding the pieces of the
+player to move and of its opponent: bit n*x+y is square (x,y), which is
+also the index of the action playing there. Moves and flips are found for
+all squares at once by shifting whole bitboards in the 8 directions and
+masking them, instead of walking the board square by square.
+
+OthelloGame converts its NumPy boards with fromArray/toArray at the API
+boundary, so boards and actions are unchanged for the rest of the code.
+'''
+import numpy as np
+
+
+class Bitboard():
+
+    # list of all 8 directions on the board, as (x,y) offsets
+    __directions = [(1,1),(1,0),(1,-1),(0,-1),(-1,-1),(-1,0),(-1,1),(0,1)]
+
+    def __init__(self, n):
+        self.n = n
+        self.full = (1 << (n * n)) - 1
+        # for each direction, the shift moving a bit one square along it, and
+        # the mask of the squares that have a neighbour in that direction
+        self.shifts = []
+        for dx, dy in self.__directions:
+            mask = 0
+            for x in range(max(0, -dx), min(n, n - dx)):
+                for y in range(max(0, -dy), min(n, n - dy)):
+                    mask |= 1 << (n * x + y)
+            self.shifts.append((n * dx + dy, mask))
+
+    def fromArray(self, board, color):
+        """
+        Returns:
+            (own, opp): the bitboards of the pieces of color and -color
+        """
+        board = np.asarray(board).ravel()
+        return bitsOf(board == color), bitsOf(board == -color)
+
+    def toArray(self, own, opp, color):
+        """
+        Returns:
+            board: the n x n NumPy board (1, -1, 0) with own pieces of color
+        """
+        board = color * arrayOf(own, self.n * self.n) - color * arrayOf(opp, self.n * self.n)
+        return board.reshape(self.n, self.n)
+
+    def legalMoves(self, own, opp):
+        """
+        Returns:
+            moves: the bitboard of the empty squares where the player with
+                   pieces own can play, i.e. that close a line of opp pieces
+        """
+        empty = self.full & ~(own | opp)
+        moves = 0
+        for shift, mask in self.shifts:
+            line = _shift(own, shift, mask) & opp
+            for _ in range(self.n - 3):  # a line holds at most n-2 opp pieces
+                line |= _shift(line, shift, mask) & opp
+            moves |= _shift(line, shift, mask) & empty
+        return moves
+
+    def hasLegalMoves(self, own, opp):
+        return self.legalMoves(own, opp) != 0
+
+    def flips(self, own, opp, move):
+        """
+        Returns:
+            flips: the bitboard of the opp pieces turned by playing bit move
+        """
+        flips = 0
+        for shift, mask in self.shifts:
+            line = 0
+            square = _shift(move, shift, mask)
+            while square & opp:
+                line |= square
+                square = _shift(square, shift, mask)
+            if square & own:
+                flips |= line
+        return flips
+
+    def executeMove(self, own, opp, move):
+        """
+        Returns:
+            (own, opp): the position after the player with pieces own plays
+                        bit move, which must be a legal move
+        """
+        flips = self.flips(own, opp, move)
+        assert flips
+        return own | flips | move, opp & ~flips
+
+    @staticmethod
+    def countDiff(own, opp):
+        """Counts the # own pieces minus the # opp pieces"""
+        return bin(own).count('1') - bin(opp).count('1')
+
+
+def _shift(bits, shift, mask):
+    bits &= mask
+    return bits << shift if shift > 0 else bits >> -shift
+
+
+def bitsOf(flags):
+    """
+    Returns:
+        bits: the int whose bit i is set when flags[i] is true
+    """
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+
+def arrayOf(bits, size):
+    """
+    Returns:
+        flags: an int array of the first size bits of bits, inverse of bitsOf
+    """
+    data = np.frombuffer(bits.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(data, bitorder='little')[:size].astype(int)
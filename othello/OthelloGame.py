@@ -2,7 +2,10 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from utils import dihedralPermutations
 from .OthelloLogic import Board
+from .OthelloBitboard import Bitboard, arrayOf
+from . import OthelloBatchLogic
 import numpy as np
 
 class OthelloGame(Game):
@@ -18,6 +21,10 @@ class OthelloGame(Game):
 
     def __init__(self, n):
         self.n = n
+        # getSymmetries applies these to the flattened board and pi, the pass action stays in place
+        self.boardPerms = dihedralPermutations(n)
+        self.actionPerms = np.append(self.boardPerms, np.full((8, 1), n * n), axis=1)
+        self.bitboard = Bitboard(n)  # the rules, played on bitboards converted from the numpy boards
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -40,57 +47,100 @@ class OthelloGame(Game):
         """
         if action == self.n*self.n:
             return (board, -player)
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        move = (int(action/self.n), action%self.n)
-        b.execute_move(move, player)
-        return (b.pieces, -player)
+        own, opp = self.bitboard.fromArray(board, player)
+        own, opp = self.bitboard.executeMove(own, opp, 1 << int(action))
+        return (self.bitboard.toArray(own, opp, player), -player)
 
     def getValidMoves(self, board, player):
         # return a fixed size binary vector
-        valids = [0]*self.getActionSize()
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        legalMoves =  b.get_legal_moves(player)
-        if len(legalMoves)==0:
+        valids = np.zeros(self.getActionSize(), dtype=int)
+        legalMoves = self.bitboard.legalMoves(*self.bitboard.fromArray(board, player))
+        if legalMoves == 0:
             valids[-1]=1
-            return np.array(valids)
-        for x, y in legalMoves:
-            valids[self.n*x+y]=1
-        return np.array(valids)
+            return valids
+        valids[:-1] = arrayOf(legalMoves, self.n*self.n)
+        return valids
 
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        if b.has_legal_moves(player):
+        own, opp = self.bitboard.fromArray(board, player)
+        if self.bitboard.hasLegalMoves(own, opp):
             return 0
-        if b.has_legal_moves(-player):
+        if self.bitboard.hasLegalMoves(opp, own):
             return 0
-        if b.countDiff(player) > 0:
+        if self.bitboard.countDiff(own, opp) > 0:
             return 1
         return -1
 
+    def getValidMovesBatch(self, boards, players):
+        """
+        Input:
+            boards: a (B, n, n) stack of boards
+            players: the player to move on each board, (B,) or a single one
+
+        Returns:
+            valids: the (B, n*n+1) getValidMoves vectors of the boards
+        """
+        own, opp = self._ownOpp(boards, players)
+        legalMoves = OthelloBatchLogic.legalMoves(own, opp).reshape(len(boards), -1)
+        valids = np.zeros((len(boards), self.getActionSize()), dtype=int)
+        valids[:, :-1] = legalMoves
+        valids[:, -1] = ~legalMoves.any(axis=1)
+        return valids
+
+    def getGameEndedBatch(self, boards, players):
+        """
+        Returns:
+            r: the (B,) getGameEnded values of the boards for their players
+        """
+        own, opp = self._ownOpp(boards, players)
+        ended = ~(OthelloBatchLogic.legalMoves(own, opp).any(axis=(1, 2)) |
+                  OthelloBatchLogic.legalMoves(opp, own).any(axis=(1, 2)))
+        won = own.sum(axis=(1, 2)) > opp.sum(axis=(1, 2))
+        return np.where(ended, np.where(won, 1, -1), 0)
+
+    def getNextStateBatch(self, boards, players, actions):
+        """
+        Input:
+            boards: a (B, n, n) stack of boards
+            players: the player to move on each board, (B,) or a single one
+            actions: the (B,) valid actions taken on the boards
+
+        Returns:
+            nextBoards: the (B, n, n) boards after the actions
+            nextPlayers: the (B,) players to move next
+        """
+        boards = np.asarray(boards)
+        players = np.broadcast_to(players, (len(boards),))
+        actions = np.asarray(actions)
+        played = actions != self.n*self.n  # passing leaves the board as it is
+        moves = np.zeros((len(boards), self.n*self.n), dtype=bool)
+        moves[played, actions[played]] = True
+        moves = moves.reshape(boards.shape)
+        own, opp = self._ownOpp(boards, players)
+        flips = OthelloBatchLogic.flips(own, opp, moves)
+        assert flips.any(axis=(1, 2))[played].all()
+        nextBoards = np.where(flips | moves, players[:, None, None], boards)
+        return nextBoards, -players
+
+    def _ownOpp(self, boards, players):
+        # the pieces of the player to move and of its opponent on each board
+        boards = np.asarray(boards) * np.reshape(players, (-1, 1, 1))
+        return boards == 1, boards == -1
+
     def getCanonicalForm(self, board, player):
         # return state if player==1, else return -state if player==-1
         return player*board
 
-    def getSymmetries(self, board, pi):
+    def getSymmetries(self, board, pi, stacked=False):
         # mirror, rotational
         assert(len(pi) == self.n**2+1)  # 1 for pass
-        pi_board = np.reshape(pi[:-1], (self.n, self.n))
-        l = []
-
-        for i in range(1, 5):
-            for j in [True, False]:
-                newB = np.rot90(board, i)
-                newPi = np.rot90(pi_board, i)
-                if j:
-                    newB = np.fliplr(newB)
-                    newPi = np.fliplr(newPi)
-                l += [(newB, list(newPi.ravel()) + [pi[-1]])]
-        return l
+        boards = board.ravel()[self.boardPerms].reshape((8,) + board.shape)
+        pis = np.asarray(pi)[self.actionPerms]
+        if stacked:
+            return boards, pis  # all 8 symmetries as two stacked arrays
+        return list(zip(boards, pis))
 
     def stringRepresentation(self, board):
         return board.tostring()
@@ -100,9 +150,7 @@ class OthelloGame(Game):
         return board_s
 
     def getScore(self, board, player):
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        return b.countDiff(player)
+        return self.bitboard.countDiff(*self.bitboard.fromArray(board, player))
 
     @staticmethod
     def display(board):
@@ -0,0 +1,99 @@
+"""
+Checks the bitboard rules of OthelloGame against the square by square ones
+of OthelloLogic.Board on random games, and its batched rules against the
+single board ones.
+
+To run tests:
+pytest-3 othello
+"""
+
+import numpy as np
+
+from .OthelloGame import OthelloGame
+from .OthelloLogic import Board
+
+
+def reference_valid_moves(game, board, player):
+    b = Board(game.n)
+    b.pieces = np.copy(board)
+    valids = [0] * game.getActionSize()
+    legalMoves = b.get_legal_moves(player)
+    if len(legalMoves) == 0:
+        valids[-1] = 1
+    for x, y in legalMoves:
+        valids[game.n * x + y] = 1
+    return valids
+
+
+def reference_next_state(game, board, player, action):
+    if action == game.n * game.n:
+        return board
+    b = Board(game.n)
+    b.pieces = np.copy(board)
+    b.execute_move((action // game.n, action % game.n), player)
+    return b.pieces
+
+
+def reference_game_ended(game, board, player):
+    b = Board(game.n)
+    b.pieces = np.copy(board)
+    if b.has_legal_moves(player) or b.has_legal_moves(-player):
+        return 0
+    return 1 if b.countDiff(player) > 0 else -1
+
+
+def test_random_games_match_reference():
+    rng = np.random.RandomState(0)
+    for n in (4, 6, 8, 10):
+        game = OthelloGame(n)
+        for _ in range(3):
+            board, player = game.getInitBoard(), 1
+            while True:
+                valids = game.getValidMoves(board, player)
+                assert list(valids) == reference_valid_moves(game, board, player)
+                ended = game.getGameEnded(board, player)
+                assert ended == reference_game_ended(game, board, player)
+                b = Board(n)
+                b.pieces = np.copy(board)
+                assert game.getScore(board, player) == b.countDiff(player)
+                if ended != 0:
+                    break
+                action = rng.choice(np.flatnonzero(valids))
+                nextBoard, nextPlayer = game.getNextState(board, player, action)
+                assert np.array_equal(nextBoard, reference_next_state(game, board, player, action))
+                assert nextPlayer == -player
+                board, player = nextBoard, nextPlayer
+
+
+def test_batch_rules_match_single_board_ones():
+    rng = np.random.RandomState(1)
+    for n in (4, 6, 8):
+        game = OthelloGame(n)
+        boards, players = [], []
+        for _ in range(20):
+            board, player = game.getInitBoard(), 1
+            for _ in range(rng.randint(n * n)):
+                if game.getGameEnded(board, player) != 0:
+                    break
+                action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+                board, player = game.getNextState(board, player, action)
+            boards.append(board)
+            players.append(player)
+        boards, players = np.array(boards), np.array(players)
+
+        valids = game.getValidMovesBatch(boards, players)
+        ended = game.getGameEndedBatch(boards, players)
+        for b, p, v, e in zip(boards, players, valids, ended):
+            assert list(v) == list(game.getValidMoves(b, p))
+            assert e == game.getGameEnded(b, p)
+
+        live = ended == 0
+        actions = [rng.choice(np.flatnonzero(v)) for v in valids[live]]
+        nextBoards, nextPlayers = game.getNextStateBatch(boards[live], players[live], actions)
+        for b, p, a, nextBoard, nextPlayer in zip(boards[live], players[live], actions, nextBoards, nextPlayers):
+            expectedBoard, expectedPlayer = game.getNextState(b, p, a)
+            assert np.array_equal(nextBoard, expectedBoard)
+            assert nextPlayer == expectedPlayer
+
+        canonical = boards * players[:, None, None]
+        assert np.array_equal(game.getValidMovesBatch(canonical, 1), valids)
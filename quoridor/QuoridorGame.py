@@ -1,10 +1,16 @@
 from __future__ import print_function
 import sys
 sys.path.append('..')
+from collections import OrderedDict
 from Game import Game
-from .QuoridorLogic import Board
+from .QuoridorLogic import Board, WALLS, getWinner, inverseState, nextState, pawnSquare
+from utils import zobristTable
 import numpy as np
 
+ZOBRIST_REMWALLS = zobristTable(2, 11)  # [player][remaining walls]
+ZOBRIST_PAWNS = zobristTable(2, 81)  # [player][9*x+y]
+ZOBRIST_WALLS = zobristTable(81, 3)  # [wall grid index][0, 1 for horizontal or 2 for vertical]
+
 
 class QuoridorGame(Game):
     """
@@ -16,8 +22,12 @@ class QuoridorGame(Game):
 
     See othello/OthelloGame.py for an example implementation.
     """
-    def __init__(self):
-        pass
+    def __init__(self, maxBoards=1024):
+        # least recently used Boards decoded from board states, see getBoard()
+        self.maxBoards = maxBoards
+        self.boards = OrderedDict()
+        self.boardHits = 0
+        self.boardMisses = 0
 
     def getInitBoard(self):
         """
@@ -26,7 +36,7 @@ class QuoridorGame(Game):
                         that will be the input to your neural network)
         """
         b = Board()
-        return b.getBoardVec()
+        return b.getState()
 
     def getBoardSize(self):
         """
@@ -52,9 +62,7 @@ class QuoridorGame(Game):
             nextBoard: board after applying action
             nextPlayer: player who plays in the next turn (should be -player)
         """
-        b = Board(board)
-        b.takeAction(player, action)
-        return b.getBoardVec(), -1*player
+        return nextState(board, player, action), -1*player
 
     def getValidMoves(self, board, player):
         """
@@ -67,9 +75,34 @@ class QuoridorGame(Game):
                         moves that are valid from the current board and player,
                         0 for invalid moves
         """
-        b = Board(board)
+        b = self.getBoard(board)
         return b.validActions(player)
 
+    def getBoard(self, board):
+        """
+        Input:
+            board: current board
+
+        Returns:
+            b: the Board decoded from board. The last maxBoards Boards are
+               kept with their graph and valid actions, so that the calls made
+               on the same position (e.g. by MCTS and the Arena) decode it
+               only once. boardHits and boardMisses count how often a Board
+               was reused. The returned Board must not be modified.
+        """
+        key = board.tobytes()
+        b = self.boards.get(key)
+        if b is not None:
+            self.boardHits += 1
+            self.boards.move_to_end(key)
+            return b
+        self.boardMisses += 1
+        b = Board(board)
+        self.boards[key] = b
+        while len(self.boards) > self.maxBoards:
+            self.boards.popitem(last=False)
+        return b
+
     def getGameEnded(self, board, player):
         """
         Input:
@@ -82,8 +115,7 @@ class QuoridorGame(Game):
                Note: these values are from the presective of player so if player 2 negate.
                
         """
-        b = Board(board)
-        res = b.getWinner()
+        res = getWinner(board)
         return res*player
 
     def getCanonicalForm(self, board, player):
@@ -100,11 +132,10 @@ class QuoridorGame(Game):
                             board as is. When the player is black, we can invert
                             the colors and return the board.
         """
-        b = Board(board)
         if player == 1:
-            return b.getBoardVec()
+            return board
         else:
-            return b.getInverseBoardVec()
+            return inverseState(board)
 
     def getSymmetries(self, board, pi):
         """
@@ -128,4 +159,21 @@ class QuoridorGame(Game):
             boardString: a quick conversion of board to a string format.
                          Required by MCTS for hashing.
         """
-        return str(board)
+        return board.tobytes()
+
+    def hashState(self, board):
+        """
+        Input:
+            board: current board
+
+        Returns:
+            key: the zobrist hash of the remaining walls, the pawn positions
+                 and the placed walls. Used by MCTS instead of
+                 stringRepresentation.
+        """
+        key = ZOBRIST_REMWALLS[0][board[0]] ^ ZOBRIST_REMWALLS[1][board[1]] ^ \
+            ZOBRIST_PAWNS[0][pawnSquare(board, 1)] ^ ZOBRIST_PAWNS[1][pawnSquare(board, -1)]
+        walls = board[WALLS]
+        for i in np.flatnonzero(walls):
+            key ^= ZOBRIST_WALLS[i][walls[i]]
+        return key
@@ -1,62 +1,90 @@
-import copy
 import numpy as np
 
+UNREACHABLE = 81  # distance of the squares from which a goal row cannot be reached
+
+# Layout of the board state, which is also the input of the NNet.
+REMWALLS = slice(0, 2)  # the remaining walls of p1 and p2
+SQUARES = slice(2, 83)  # 1 on the square 9*x+y of the p1 pawn, 2 on the one of the p2 pawn
+WALLS = slice(83, 164)  # 9x9 grid holding the wall spot (x,y) of the 8x8 grid at (x,8-y)
+STATE_SIZE = 164
+
+
 class Board():
     """
-    The board can be generate from the current board positions stored as a vector.
-    This vector has length 2 + 2 + 64, corresponding to 
+    The board can be generated from the current board state, a numpy array of 164 int8 values:
     (a) the players remaining walls, [p1,p2]
-    (b) the position of p1 pawn and p2 pawn [(a,b),(x,y)]
-    (c) the wall spots with 0 if no wall, 1 if horizontal wall, and 2 if vertical wall.
-    An initial board vector is given by [10,10]+[(4,0),(4,8)]+64*[0]
+    (b) the 81 squares, with 1 on the square 9*x+y of the p1 pawn and 2 on the one of the p2 pawn
+    (c) the wall spots with 0 if no wall, 1 if horizontal wall, and 2 if vertical wall, padded
+        to a 9x9 grid in which the spot (x,y) is at (x,8-y).
+    The initial board has 10 walls for each player and the pawns at (4,0) and (4,8).
     
     We use this generation technique to play nicely with existing code in which the board is passed
-    around as just this vector. We can also pass the NNet this vector as input.
+    around as just this array. The array is laid out as the input of the NNet, so it is passed as is.
     
     It is also easy to get a canonical board position by inverting the board and switching the positions
-    of p1 and p2 pawns.
+    of p1 and p2 pawns, see inverseState().
     
     It is always assumed that player 1 is currently going.
     """
-    def __init__(self, vec = [10,10]+[(4,0),(4,8)]+64*[0]):
-        self.vec = vec
-        self.p1walls = vec[0]
-        self.p2walls = vec[1]
-        self.p1pos = vec[2]
-        self.p2pos = vec[3]
+    def __init__(self, state=None):
+        if state is None:
+            self.p1walls, self.p2walls = 10, 10
+            self.p1pos, self.p2pos = (4,0), (4,8)
+            self.walls = np.zeros((8,8), dtype=int)
+        else:
+            self.p1walls, self.p2walls = int(state[0]), int(state[1])
+            self.p1pos = divmod(pawnSquare(state, 1), 9)
+            self.p2pos = divmod(pawnSquare(state, -1), 9)
+            # Walls are stored in an 8x8 grid which can be accesed by [x,y] coordinates.
+            self.walls = np.asarray(state[WALLS]).reshape(9,9)[:8,8:0:-1].astype(int)
         
-        # Walls are stored in an 8x8 grid which can be accesed by [x,y] coordinates.
-        walls = vec[4:]
-        self.walls = np.array([walls[8*i:8+8*i] for i in range(8)])
+        # The board graph is stored as two arrays of open edges: openX[x,y] is True if no wall
+        # separates (x,y) from (x+1,y), openY[x,y] if no wall separates (x,y) from (x,y+1).
+        # A horizontal wall at (x,y) closes openY[x,y] and openY[x+1,y], a vertical one openX[x,y]
+        # and openX[x,y+1].
+        horz = self.walls == 1
+        vert = self.walls == 2
+        self.openY = np.ones((9,8), dtype=bool)
+        self.openY[:8] &= ~horz
+        self.openY[1:] &= ~horz
+        self.openX = np.ones((8,9), dtype=bool)
+        self.openX[:,:8] &= ~vert
+        self.openX[:,1:] &= ~vert
         
-        # The board is stored as graph. The data structure is a dictionary with the keys as
-        # positions and the values and adjacent connected positions.
-        graph = {}
-        for x in range(9):
-            for y in range(9):
-                graph[(x,y)] = []
-                if x > 0:
-                    graph[(x,y)].append((x-1,y))
-                if x < 8:
-                    graph[(x,y)].append((x+1,y))
-                if y > 0:
-                    graph[(x,y)].append((x,y-1))
-                if y < 8:
-                    graph[(x,y)].append((x,y+1))
-        self.boardGraph = graph
+        # The distance maps to the goal rows of p1 (y = 8) and p2 (y = 0), computed when needed.
+        self.distances = {}
+        # The valid actions of each player, computed when needed.
+        self.actions = {}
+
+    def getState(self):
+        """
+        Returns: the board state, an int8 array of length 2+81+81 (see Board).
+        """
+        state = np.zeros(STATE_SIZE, dtype=np.int8)
+        state[REMWALLS] = self.p1walls, self.p2walls
+        state[SQUARES][9*self.p1pos[0]+self.p1pos[1]] = 1
+        state[SQUARES][9*self.p2pos[0]+self.p2pos[1]] = 2
+        state[WALLS].reshape(9,9)[:8,8:0:-1] = self.walls
+        return state
         
     def getBoardVec(self):
         """
         Returns: A vector of length 2+2+64 encoding the remaining walls, squares, and walls.
         """
         return [self.p1walls, self.p2walls, self.p1pos, self.p2pos] + list(self.walls.flatten())
-    
-    def getInverseBoardVec(self):
-        remWalls = [self.p2walls, self.p1walls]
-        pos = [(self.p2pos[0],8-self.p2pos[1]),(self.p1pos[0],8-self.p1pos[1])]
-        walls = [x for col in self.walls for x in col[::-1]]
-        return remWalls + pos + walls
 
+    def isOpen(self, a, b):
+        """
+        Returns True if a and b are adjacent squares of the board that no wall separates.
+        """
+        (x1,y1), (x2,y2) = a, b
+        if not (0 <= x2 <= 8 and 0 <= y2 <= 8):
+            return False
+        if y1 == y2 and abs(x1-x2) == 1:
+            return bool(self.openX[min(x1,x2),y1])
+        if x1 == x2 and abs(y1-y2) == 1:
+            return bool(self.openY[x1,min(y1,y2)])
+        return False
     
     def validPawnMoves(self, player):
         """
@@ -81,32 +109,32 @@ class Board():
         moves = []
         # Check left and right
         for i in [1,-1]:
-            if (x+i,y) in self.boardGraph[(x,y)]:
+            if self.isOpen((x,y), (x+i,y)):
                 # if space open add to moves
                 if other != (x+i,y):
                     moves.append((x+i,y))
                 else: 
                     # otherwise see if jumping over is allowed
-                    if (x+2*i,y) in self.boardGraph[(x+i,y)]:
+                    if self.isOpen((x+i,y), (x+2*i,y)):
                         moves.append((x+2*i,y))
                     else:
                         # last, add the diagonal jumps if available.
-                        if (x+i,y+i) in self.boardGraph[(x+i,y)]:
+                        if self.isOpen((x+i,y), (x+i,y+i)):
                             moves.append((x+i,y+i))
-                        if (x+i,y-i) in self.boardGraph[(x+i,y)]:
+                        if self.isOpen((x+i,y), (x+i,y-i)):
                             moves.append((x+i,y-i))
         
         for i in [1,-1]:
-            if (x,y+i) in self.boardGraph[(x,y)]:
+            if self.isOpen((x,y), (x,y+i)):
                 if other != (x,y+i):
                     moves.append((x,y+i))
                 else: 
-                    if (x,y+2*i) in self.boardGraph[(x,y+i)]:
+                    if self.isOpen((x,y+i), (x,y+2*i)):
                         moves.append((x,y+2*i))
                     else:
-                        if (x+i,y+i) in self.boardGraph[(x,y+i)]:
+                        if self.isOpen((x,y+i), (x+i,y+i)):
                             moves.append((x+i,y+i))
-                        if (x-i,y+i) in self.boardGraph[(x,y+i)]:
+                        if self.isOpen((x,y+i), (x-i,y+i)):
                             moves.append((x-i,y+i))
                             
         return moves
@@ -122,6 +150,35 @@ class Board():
             self.p1pos = (x,y)
         else:
             self.p2pos = (x,y)
+        self.actions = {}
+
+    def distanceMap(self, goal):
+        """
+        goal: the goal row, 8 for p1 and 0 for p2
+
+        Returns the 9x9 array of the number of moves from each square to the goal row (ignoring
+        the pawns), UNREACHABLE for the squares the walls cut off from it. Kept until a wall is placed.
+        """
+        if goal not in self.distances:
+            self.distances[goal] = distanceMap(self.openX, self.openY, goal)
+        return self.distances[goal]
+
+    def shortestPath(self, pos, goal):
+        """
+        Returns the edges of a shortest path from pos to the goal row, as a list of
+        ('x', x, y) for openX[x,y] and ('y', x, y) for openY[x,y].
+        """
+        dist = self.distanceMap(goal)
+        path = []
+        x, y = pos
+        while 0 < dist[x,y] < UNREACHABLE:
+            for (a,b), edge in [((x,y+1), ('y',x,y)), ((x,y-1), ('y',x,y-1)),
+                                ((x+1,y), ('x',x,y)), ((x-1,y), ('x',x-1,y))]:
+                if self.isOpen((x,y), (a,b)) and dist[a,b] == dist[x,y] - 1:
+                    path.append(edge)
+                    x, y = a, b
+                    break
+        return path
         
     def validWalls(self, player):
         """
@@ -129,48 +186,39 @@ class Board():
         
         Returns a length 64+64 list of 1's and 0's. In particular a wall cannot 
         be placed if it would hit another wall, or if it would cut of a player from their goal. 
-        This second case (which requires a DFS of the board graph) is handeled by testWallPlacement()
+        A wall that cuts no edge of a shortest path of either pawn leaves both distances to the
+        goals unchanged, so only the walls cutting one of these paths are checked with
+        testWallPlacement().
         """
         if player == 1 and self.p1walls == 0:
             return 128*[0]
         if player == -1 and self.p2walls == 0:
             return 128*[0]
         
-        horz = 64*[0]
-        for x in range(8):
-            for y in range(8):
-                n = 8*x+y
-                if x == 0:
-                    if self.walls[x,y] == 0 and self.walls[x+1,y] != 1:
-                        if self.testWallPlacement(x,y,1):
-                            horz[n]=1
-                elif x == 7:
-                    if self.walls[x,y] == 0 and self.walls[x-1,y] != 1:
-                        if self.testWallPlacement(x,y,1):
-                            horz[n]=1
-                else:
-                    if self.walls[x,y] == 0 and self.walls[x+1,y] != 1 and self.walls[x-1,y] != 1:
-                        if self.testWallPlacement(x,y,1):
-                            horz[n]=1
-                            
-        vert = 64*[0]
-        for x in range(8):
-            for y in range(8):
-                n = 8*x+y
-                if y == 0:
-                    if self.walls[x,y] == 0 and self.walls[x,y+1] != 2:
-                        if self.testWallPlacement(x,y,2):
-                            vert[n]=1
-                elif y == 7:
-                    if self.walls[x,y] == 0 and self.walls[x,y-1] != 2:
-                        if self.testWallPlacement(x,y,2):
-                            vert[n]=1
-                else:
-                    if self.walls[x,y] == 0 and self.walls[x,y+1] != 2 and self.walls[x,y-1] != 2:
-                        if self.testWallPlacement(x,y,2):
-                            vert[n]=1
+        # walls fitting on the board without crossing or overlapping another wall
+        horz = self.walls == 0
+        horz[1:] &= self.walls[:-1] != 1
+        horz[:-1] &= self.walls[1:] != 1
+        vert = self.walls == 0
+        vert[:,1:] &= self.walls[:,:-1] != 2
+        vert[:,:-1] &= self.walls[:,1:] != 2
+        
+        # walls cutting an edge of the shortest paths: a horizontal wall at (x,y) cuts
+        # openY[x,y] and openY[x+1,y], a vertical wall at (x,y) cuts openX[x,y] and openX[x,y+1]
+        cutHorz = np.zeros((8,8), dtype=bool)
+        cutVert = np.zeros((8,8), dtype=bool)
+        for edge, x, y in self.shortestPath(self.p1pos, 8) + self.shortestPath(self.p2pos, 0):
+            if edge == 'y':
+                cutHorz[max(x-1,0):x+1,y] = True
+            else:
+                cutVert[x,max(y-1,0):y+1] = True
+        
+        for x, y in np.argwhere(horz & cutHorz):
+            horz[x,y] = self.testWallPlacement(x,y,1)
+        for x, y in np.argwhere(vert & cutVert):
+            vert[x,y] = self.testWallPlacement(x,y,2)
                             
-        return horz+vert
+        return list(horz.flatten().astype(int)) + list(vert.flatten().astype(int))
     
     def testWallPlacement(self,x,y,orientation):
         """
@@ -179,50 +227,15 @@ class Board():
         
         Returns True if placing such a wall does not disconnect either player from their goal, else False.
         
-        This is done by a DFS of the boardGraph after the wall has been placed.
+        This is done by growing the squares reachable from each goal row after the wall has been placed.
         """
-        #update the boardGraph after the wall placement
-        graph = copy.deepcopy(self.boardGraph)
-        
+        openX, openY = self.openX.copy(), self.openY.copy()
         if orientation == 1:
-            graph[(x,y)].remove((x,y+1))
-            graph[(x,y+1)].remove((x,y))
-            graph[(x+1,y)].remove((x+1,y+1))
-            graph[(x+1,y+1)].remove((x+1,y))
-            
+            openY[x:x+2,y] = False
         else:
-            graph[(x,y)].remove((x+1,y))
-            graph[(x+1,y)].remove((x,y))
-            graph[(x,y+1)].remove((x+1,y+1))
-            graph[(x+1,y+1)].remove((x,y+1))
+            openX[x,y:y+2] = False
         
-        # check if p1 is disconnected from goal
-        p1connected = False
-        visited = set()
-        queue = [self.p1pos]
-        while queue and not p1connected:
-            vert = queue.pop(0)
-            if vert[1] == 8:
-                p1connected = True
-            for i in graph[vert]:
-                if i not in visited:
-                    queue.append(i)
-                    visited.add(i)
-        
-        # check if p2 is disconnected from goal
-        p2connected = False
-        visited = set()
-        queue = [self.p2pos]
-        while queue and not p2connected:
-            vert = queue.pop(0)
-            if vert[1] == 0:
-                p2connected = True
-            for i in graph[vert]:
-                if i not in visited:
-                    queue.append(i)
-                    visited.add(i)
-                    
-        return p1connected and p2connected
+        return reachesGoal(openX, openY, self.p1pos, 8) and reachesGoal(openX, openY, self.p2pos, 0)
         
     
     def placeWall(self,x,y,orientation):
@@ -231,30 +244,28 @@ class Board():
         corner of a square on the game board.
         orientation: 1 for horz and 2 for vert
         
-        updates self.walls and self.boardGraph
+        updates self.walls and the open edges
         """
         self.walls[x,y] = orientation
         
         if orientation == 1:
-            self.boardGraph[(x,y)].remove((x,y+1))
-            self.boardGraph[(x,y+1)].remove((x,y))
-            self.boardGraph[(x+1,y)].remove((x+1,y+1))
-            self.boardGraph[(x+1,y+1)].remove((x+1,y))
-            
+            self.openY[x:x+2,y] = False
         else:
-            self.boardGraph[(x,y)].remove((x+1,y))
-            self.boardGraph[(x+1,y)].remove((x,y))
-            self.boardGraph[(x,y+1)].remove((x+1,y+1))
-            self.boardGraph[(x+1,y+1)].remove((x,y+1))
+            self.openX[x,y:y+2] = False
+        self.distances = {}
+        self.actions = {}
     
     def validActions(self, player):
         """
         returns a list of length 81+64+64 corresponding to pawn moves and wall placements (horz,vert).
+        The result is kept until a pawn moves or a wall is placed.
         """
-        moves = 81*[0]
-        for x,y in self.validPawnMoves(player):
-            moves[9*x+y] = 1
-        return moves + self.validWalls(player)
+        if player not in self.actions:
+            moves = 81*[0]
+            for x,y in self.validPawnMoves(player):
+                moves[9*x+y] = 1
+            self.actions[player] = moves + self.validWalls(player)
+        return list(self.actions[player])
     
     def takeAction(self, player, action):
         """
@@ -338,4 +349,103 @@ class Board():
                     col += 1
             # print row and next row is a different type of row
             print(out)
-            switch = not switch
\ No newline at end of file
+            switch = not switch
+
+
+def distanceMap(openX, openY, goal):
+    """
+    Returns the 9x9 array of the number of moves from each square to row goal, through the open
+    edges openX and openY (see Board), UNREACHABLE for the squares cut off from it. The squares at
+    distance d+1 are found for all of them at once by shifting those at distance d along the open edges.
+    """
+    dist = np.full((9,9), UNREACHABLE, dtype=int)
+    frontier = np.zeros((9,9), dtype=bool)
+    frontier[:,goal] = True
+    d = 0
+    while frontier.any():
+        dist[frontier] = d
+        frontier = _step(frontier, openX, openY) & (dist == UNREACHABLE)
+        d += 1
+    return dist
+
+
+def reachesGoal(openX, openY, pos, goal):
+    """
+    Returns True if square pos is connected to row goal through the open edges openX and openY,
+    stopping as soon as it is reached.
+    """
+    reached = np.zeros((9,9), dtype=bool)
+    frontier = np.zeros((9,9), dtype=bool)
+    frontier[:,goal] = True
+    while frontier.any():
+        if frontier[pos]:
+            return True
+        reached |= frontier
+        frontier = _step(frontier, openX, openY) & ~reached
+    return False
+
+
+def _step(frontier, openX, openY):
+    # the squares one open edge away from the frontier
+    reached = np.zeros((9,9), dtype=bool)
+    reached[1:,:] |= frontier[:-1,:] & openX
+    reached[:-1,:] |= frontier[1:,:] & openX
+    reached[:,1:] |= frontier[:,:-1] & openY
+    reached[:,:-1] |= frontier[:,1:] & openY
+    return reached
+
+
+def pawnSquare(state, player):
+    """
+    Returns the index 9*x+y of the square of the pawn of player (1 or -1) in the board state.
+    """
+    return int(np.argmax(state[SQUARES] == (1 if player == 1 else 2)))
+
+
+def getWinner(state):
+    """
+    Returns 1 if player 1 has won, -1 if player 2 has won, and 0 if neither has won, like
+    Board.getWinner() but read directly from the board state.
+    """
+    if pawnSquare(state, 1) % 9 == 8:
+        return 1
+    elif pawnSquare(state, -1) % 9 == 0:
+        return -1
+    else:
+        return 0
+
+
+def inverseState(state):
+    """
+    Returns the board state seen by player 2: the remaining walls and the pawns are swapped,
+    and the board is flipped along y.
+    """
+    inverse = np.empty_like(state)
+    inverse[REMWALLS] = state[1::-1]
+    squares = state[SQUARES].reshape(9,9)[:,::-1]
+    inverse[SQUARES] = np.where(squares > 0, 3 - squares, 0).ravel()
+    # the spot (x,y) moves to (x,7-y), i.e. the column 8-y of the grid moves to 1+y
+    walls = state[WALLS].reshape(9,9)
+    inverseWalls = inverse[WALLS].reshape(9,9)
+    inverseWalls[:,0] = 0
+    inverseWalls[:,1:] = walls[:,:0:-1]
+    return inverse
+
+
+def nextState(state, player, action):
+    """
+    Returns a copy of the board state after player takes action, like Board.takeAction() but
+    without decoding the board.
+    """
+    state = np.array(state)
+    if action <= 80:
+        pawn = 1 if player == 1 else 2
+        squares = state[SQUARES]
+        squares[squares == pawn] = 0
+        squares[action] = pawn
+    else:
+        orientation, spot = (1, action-81) if action <= 144 else (2, action-145)
+        x,y = spot // 8, spot % 8
+        state[WALLS][9*x+8-y] = orientation
+        state[0 if player == 1 else 1] -= 1
+    return state
@@ -8,6 +8,7 @@ from tqdm import tqdm
 sys.path.append('../../')
 from utils import *
 from NeuralNet import NeuralNet
+from ExampleDataset import ExampleDataset, exampleLoader
 
 import torch
 import torch.optim as optim
@@ -21,6 +22,7 @@ args = dotdict({
     'batch_size': 64,
     'cuda': torch.cuda.is_available(),
     'num_channels': 512,
+    'num_workers': 0,
 })
 
 
@@ -35,26 +37,20 @@ class NNetWrapper(NeuralNet):
             
     def convertBoard(self, board):
         """
-        Input: A list of length 2+2+64, [p1walls, p2walls, (x,y), (x,y), walls]
+        Input: A board state array of length 2+81+81 (see QuoridorLogic.Board)
         
-        Output: A list of length 2+81+81 [p1walls, p2walls, squares, padded walls]
+        Output: The same array, which is already laid out as the network input
+        [p1walls, p2walls, squares, padded walls]
         """
-        remWalls = board[0:2]
-        squares = 81*[0]
-        x,y = board[2]
-        squares[9*x+y] = 1
-        x,y = board[3]
-        squares[9*x+y] = 2
-        walls = board[4:]
-        walls = [walls[8*i:8+8*i]+[0] for i in range(8)] + [9*[0]]
-        walls = [x for col in walls for x in col[::-1]]
-        return remWalls + squares + walls
+        return board
 
     def train(self, examples):
         """
         examples: list of examples, each example is of form (board, pi, v)
         """
         optimizer = optim.Adam(self.nnet.parameters())
+        dataset = ExampleDataset(examples, self.convertBoard)
+        loader = exampleLoader(dataset, args.batch_size, cuda=args.cuda, num_workers=args.num_workers)
 
         for epoch in range(args.epochs):
             print('EPOCH ::: ' + str(epoch + 1))
@@ -62,17 +58,8 @@ class NNetWrapper(NeuralNet):
             pi_losses = AverageMeter()
             v_losses = AverageMeter()
 
-            batch_count = int(len(examples) / args.batch_size)
-
-            t = tqdm(range(batch_count), desc='Training Net')
-            for _ in t:
-                sample_ids = np.random.randint(len(examples), size=args.batch_size)        
-                boards, pis, vs = list(zip(*[examples[i] for i in sample_ids]))
-                boards = [convertBoard(board) for board in boards]
-                boards = torch.FloatTensor(np.array(boards).astype(np.float64))
-                target_pis = torch.FloatTensor(np.array(pis))
-                target_vs = torch.FloatTensor(np.array(vs).astype(np.float64))
-
+            t = tqdm(loader, desc='Training Net')
+            for boards, target_pis, target_vs in t:
                 # predict
                 if args.cuda:
                     boards, target_pis, target_vs = boards.contiguous().cuda(), target_pis.contiguous().cuda(), target_vs.contiguous().cuda()
@@ -112,6 +99,19 @@ class NNetWrapper(NeuralNet):
         # print('PREDICTION TIME TAKEN : {0:03f}'.format(time.time()-start))
         return torch.exp(pi).data.cpu().numpy()[0], v.data.cpu().numpy()[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: list of np arrays with boards
+        """
+        # preparing input
+        boards = torch.FloatTensor(np.array([self.convertBoard(board) for board in boards]).astype(np.float64))
+        if args.cuda: boards = boards.contiguous().cuda()
+        self.nnet.eval()
+        with torch.no_grad():
+            pi, v = self.nnet(boards)
+
+        return torch.exp(pi).data.cpu().numpy(), v.data.cpu().numpy()[:, 0]
+
     def loss_pi(self, targets, outputs):
         return -torch.sum(targets * outputs) / targets.size()[0]
 
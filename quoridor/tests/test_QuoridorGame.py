@@ -0,0 +1,84 @@
+"""
+Checks that QuoridorGame, which works on the board state array directly, agrees
+with the decoded QuoridorLogic.Board.
+
+To run tests:
+python -m pytest quoridor/tests/test_QuoridorGame.py
+"""
+import sys
+sys.path.append('../..')
+import unittest
+
+import numpy as np
+
+from quoridor.QuoridorGame import QuoridorGame
+from quoridor.QuoridorLogic import Board
+
+
+class TestQuoridorGame(unittest.TestCase):
+
+    def test_random_games(self):
+        game = QuoridorGame()
+        rng = np.random.RandomState(1)
+        for _ in range(5):
+            board, player = game.getInitBoard(), 1
+            while game.getGameEnded(board, player) == 0:
+                b = Board(board)
+                np.testing.assert_array_equal(b.getState(), board)
+                self.assertEqual(game.getGameEnded(board, 1), b.getWinner())
+
+                inverse = Board(game.getCanonicalForm(board, -1))
+                self.assertEqual((inverse.p1walls, inverse.p2walls), (b.p2walls, b.p1walls))
+                self.assertEqual(inverse.p1pos, (b.p2pos[0], 8 - b.p2pos[1]))
+                self.assertEqual(inverse.p2pos, (b.p1pos[0], 8 - b.p1pos[1]))
+                np.testing.assert_array_equal(inverse.walls, b.walls[:, ::-1])
+                np.testing.assert_array_equal(game.getCanonicalForm(inverse.getState(), -1), board)
+
+                valids = np.flatnonzero(game.getValidMoves(board, player))
+                walls = valids[valids > 80]
+                action = rng.choice(walls) if len(walls) and rng.rand() < 0.5 else rng.choice(valids[valids <= 80])
+                b.takeAction(player, action)
+                board, player = game.getNextState(board, player, action)
+                np.testing.assert_array_equal(board, b.getState())
+
+    def test_hash_follows_string_representation(self):
+        game = QuoridorGame()
+        rng = np.random.RandomState(2)
+        hashes = {}  # stringRepresentation -> hashState
+        for _ in range(5):
+            board, player = game.getInitBoard(), 1
+            while game.getGameEnded(board, player) == 0:
+                for b in (board, game.getCanonicalForm(board, -1)):
+                    key = game.stringRepresentation(b)
+                    self.assertEqual(hashes.setdefault(key, game.hashState(b)), game.hashState(b))
+                valids = np.flatnonzero(game.getValidMoves(board, player))
+                walls = valids[valids > 80]
+                action = rng.choice(walls) if len(walls) and rng.rand() < 0.5 else rng.choice(valids[valids <= 80])
+                board, player = game.getNextState(board, player, action)
+        self.assertEqual(len(set(hashes.values())), len(hashes))
+
+        # the same walls placed in another order give the same board and hash
+        board = game.getInitBoard()
+        first = game.getNextState(game.getNextState(board, 1, 81)[0], -1, 81 + 64 + 10)[0]
+        second = game.getNextState(game.getNextState(board, -1, 81 + 64 + 10)[0], 1, 81)[0]
+        self.assertEqual(game.stringRepresentation(first), game.stringRepresentation(second))
+        self.assertEqual(game.hashState(first), game.hashState(second))
+
+    def test_board_cache(self):
+        game = QuoridorGame(maxBoards=2)
+        board = game.getInitBoard()
+        valids = game.getValidMoves(board, 1)
+        self.assertIs(game.getBoard(board), game.getBoard(np.copy(board)))
+        self.assertEqual((game.boardHits, game.boardMisses), (2, 1))
+
+        valids[0] = 1  # the cached valid actions are not shared with the caller
+        self.assertEqual(game.getValidMoves(board, 1), Board(board).validActions(1))
+
+        for action in (81, 82):
+            game.getValidMoves(game.getNextState(board, 1, action)[0], -1)
+        self.assertEqual(len(game.boards), 2)
+        self.assertNotIn(board.tobytes(), game.boards)
+
+
+if __name__ == '__main__':
+    unittest.main()
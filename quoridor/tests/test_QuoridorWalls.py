@@ -0,0 +1,85 @@
+"""
+Checks the wall legality of QuoridorLogic.Board, which only re-checks the walls
+cutting a shortest path, against a plain BFS for every wall on random games.
+
+To run tests:
+python -m pytest quoridor/tests/test_QuoridorWalls.py
+"""
+import sys
+sys.path.append('../..')
+import unittest
+
+import numpy as np
+
+from quoridor.QuoridorLogic import Board
+
+
+def cutEdges(x, y, orientation):
+    if orientation == 1:
+        return [((x,y),(x,y+1)), ((x+1,y),(x+1,y+1))]
+    return [((x,y),(x+1,y)), ((x,y+1),(x+1,y+1))]
+
+
+def reachable(walls, start, goal):
+    blocked = set()
+    for x, y in np.argwhere(walls > 0):
+        for a, b in cutEdges(x, y, walls[x,y]):
+            blocked |= {(a,b), (b,a)}
+    visited, queue = {start}, [start]
+    while queue:
+        x, y = queue.pop()
+        if y == goal:
+            return True
+        for square in [(x+1,y), (x-1,y), (x,y+1), (x,y-1)]:
+            if 0 <= square[0] <= 8 and 0 <= square[1] <= 8 and square not in visited \
+                    and ((x,y), square) not in blocked:
+                visited.add(square)
+                queue.append(square)
+    return False
+
+
+def referenceValidWalls(board, player):
+    if (board.p1walls if player == 1 else board.p2walls) == 0:
+        return 128*[0]
+    walls = board.walls
+    valids = []
+    for orientation in [1, 2]:
+        for x in range(8):
+            for y in range(8):
+                dx, dy = (1, 0) if orientation == 1 else (0, 1)
+                fits = walls[x,y] == 0 and all(
+                    not (0 <= x+i*dx <= 7 and 0 <= y+i*dy <= 7) or walls[x+i*dx,y+i*dy] != orientation
+                    for i in [1, -1])
+                if fits:
+                    placed = walls.copy()
+                    placed[x,y] = orientation
+                    fits = reachable(placed, board.p1pos, 8) and reachable(placed, board.p2pos, 0)
+                valids.append(int(fits))
+    return valids
+
+
+class TestValidWalls(unittest.TestCase):
+
+    def test_random_games(self):
+        rng = np.random.RandomState(0)
+        for _ in range(5):
+            state, player = Board().getState(), 1
+            for _ in range(60):
+                b = Board(state)
+                self.assertEqual(b.validWalls(player), referenceValidWalls(b, player))
+                valids = np.flatnonzero(b.validActions(player))
+                walls = valids[valids > 80]
+                action = rng.choice(walls) if len(walls) and rng.rand() < 0.6 else rng.choice(valids[valids <= 80])
+                b.takeAction(player, action)
+                state, player = b.getState(), -player
+                if b.getWinner() != 0:
+                    break
+
+    def test_walls_of_the_board_state_block_pawns(self):
+        b = Board()
+        b.walls[4,0] = 1  # horizontal wall in front of p1
+        self.assertNotIn((4,1), Board(b.getState()).validPawnMoves(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
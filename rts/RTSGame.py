@@ -8,6 +8,7 @@ from rts.src.config_class import CONFIG
 sys.path.append('..')
 from rts.src.Board import Board
 from rts.src.config import NUM_ENCODERS, NUM_ACTS, P_NAME_IDX, A_TYPE_IDX, TIME_IDX, FPS
+from utils import dihedralPermutations
 
 """ USE_TIMEOUT, MAX_TIME, d_a_type, a_max_health, INITIAL_GOLD, TIMEOUT, visibility"""
 
@@ -24,6 +25,10 @@ class RTSGame:
 
     def __init__(self) -> None:
         self.n = CONFIG.grid_size
+        # getSymmetries applies these to the flattened board and pi, the pass action stays in place
+        self.boardPerms = dihedralPermutations(self.n, NUM_ENCODERS)
+        self.actionPerms = np.append(dihedralPermutations(self.n, NUM_ACTS), np.full((8, 1), self.n * self.n * NUM_ACTS),
+                                     axis=1)
 
         self.initial_board_config = CONFIG.initial_board_config
 
@@ -170,25 +175,39 @@ class RTSGame:
         # continue game
         return 0
 
+    def getGameEndedAfterMove(self, board: np.ndarray, player, action: int) -> float:
+        """
+        Used by MCTS, Arena and Coach like Game.getGameEndedAfterMove. The end of an rts game does not depend on the last move alone, so this is getGameEnded
+        :param board: game state after action
+        :param player: player to move next
+        :param action: the action that led to board
+        :return: same as getGameEnded
+        """
+        return self.getGameEnded(board, player)
+
     def getCanonicalForm(self, board: np.ndarray, player: int):
         b = np.copy(board)
         b[:, :, P_NAME_IDX] = b[:, :, P_NAME_IDX] * player
         return b
 
-    def getSymmetries(self, board: np.ndarray, pi):
+    def getSymmetries(self, board: np.ndarray, pi, stacked: bool = False):
         # mirror, rotational
         assert (len(pi) == self.n * self.n * NUM_ACTS + 1)  # 1 for pass
-        pi_board = np.reshape(pi[:-1], (self.n, self.n, NUM_ACTS))
-        return_list = []
-        for i in range(1, 5):
-            for j in [True, False]:
-                newB = np.rot90(board, i)
-                newPi = np.rot90(pi_board, i)
-                if j:
-                    newB = np.fliplr(newB)
-                    newPi = np.fliplr(newPi)
-                return_list += [(newB, list(newPi.ravel()) + [pi[-1]])]
-        return return_list
+        boards = board.ravel()[self.boardPerms].reshape((8,) + board.shape)
+        pis = np.asarray(pi)[self.actionPerms]
+        if stacked:
+            return boards, pis  # all 8 symmetries as two stacked arrays
+        return list(zip(boards, pis))
+
+    def getRandomSymmetry(self, board: np.ndarray, pi):
+        """
+        Used by SymmetricExamples with args.lazySymmetries, like Game.getRandomSymmetry
+        :param board: current board
+        :param pi: policy vector
+        :return: one of the 8 symmetries of getSymmetries, chosen uniformly at random
+        """
+        k = np.random.randint(len(self.boardPerms))
+        return board.ravel()[self.boardPerms[k]].reshape(board.shape), np.asarray(pi)[self.actionPerms[k]]
 
     def stringRepresentation(self, board: np.ndarray):
         return board.tostring()
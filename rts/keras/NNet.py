@@ -5,6 +5,7 @@ import numpy as np
 
 sys.path.append('../..')
 from NeuralNet import NeuralNet
+from utils import trainingEpochs
 from rts.keras.RTSNNet import RTSNNet
 from rts.src.config import VERBOSE_MODEL_FIT
 
@@ -43,17 +44,18 @@ class NNetWrapper(NeuralNet):
         """
         from rts.src.config_class import CONFIG
 
-        input_boards, target_pis, target_vs = list(zip(*examples))
-        input_boards = np.asarray(input_boards)
-        target_pis = np.asarray(target_pis)
-        target_vs = np.asarray(target_vs)
+        for epochExamples, epochs in trainingEpochs(examples, CONFIG.nnet_args.epochs):
+            input_boards, target_pis, target_vs = list(zip(*epochExamples))
+            input_boards = np.asarray(input_boards)
+            target_pis = np.asarray(target_pis)
+            target_vs = np.asarray(target_vs)
 
-        """
-        input_boards = CONFIG.nnet_args.encoder.encode_multiple(input_boards)
-        """
-        input_boards = self.encoder.encode_multiple(input_boards)
+            """
+            input_boards = CONFIG.nnet_args.encoder.encode_multiple(input_boards)
+            """
+            input_boards = self.encoder.encode_multiple(input_boards)
 
-        self.nnet.model.fit(x=input_boards, y=[target_pis, target_vs], batch_size=CONFIG.nnet_args.batch_size, epochs=CONFIG.nnet_args.epochs, verbose=VERBOSE_MODEL_FIT)
+            self.nnet.model.fit(x=input_boards, y=[target_pis, target_vs], batch_size=CONFIG.nnet_args.batch_size, epochs=epochs, verbose=VERBOSE_MODEL_FIT)
 
     def predict(self, board, player=None):
         """
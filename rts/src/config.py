@@ -509,6 +509,10 @@ class Configuration:
             self.save_train_examples = save_train_examples
             self.load_train_examples = load_train_examples
 
+        def get(self, name, default=None):
+            # Coach and MCTS read their optional settings like from a dotdict
+            return getattr(self, name, default)
+
     class BoardTile:
         def __init__(self,
                      player: int,
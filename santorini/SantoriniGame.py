@@ -26,6 +26,7 @@ class SantoriniGame(Game):
 
     def __init__(self, board_length=5, true_random_placement=False):
         self.n = board_length
+        self.boardPerms, self.actionPerms = self.getSymmetryPermutations()
         
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -183,60 +184,45 @@ class SantoriniGame(Game):
         
         return np.array([newB0, newB1])
 
-    def getSymmetries(self, board, pi):
+    def getSymmetries(self, board, pi, stacked=False):
         # mirror, rotational
 
         assert(len(pi) == 128)  # each player has two pieces which can move in 
         
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        
-        syms = []
-        
-        Pi0 = pi[:64]
-        Pi1 = pi[64:]
-        
-        
+        boards = board.ravel()[self.boardPerms].reshape((8,) + board.shape)
+        pis = np.asarray(pi)[self.actionPerms]
+        if stacked:
+            return boards, pis  # all 8 symmetries as two stacked arrays
+        return list(zip(boards, pis))
+
+    def getSymmetryPermutations(self):
+        """
+        Returns: the index arrays getSymmetries applies to the flattened board
+                 and to pi, found by running the sequence of rotations and
+                 flips it was written with on indices. Every step rotates the
+                 board once more (rotate, rotate+flip, rotate^2, ...), and a
+                 flip of pi is taken before that step's rotation of pi.
+        """
+        squares = np.arange(2 * self.n * self.n).reshape(2, self.n, self.n)
+        Pi0 = list(range(64))
+        Pi1 = list(range(64, 128))
+        boardPerms = []
+        actionPerms = []
         for i in range(1, 5):
             for k in [True, False]:
-                # rotate board:
-                newB0 = np.rot90(b.pieces[0], 1)
-                newB1 = np.rot90(b.pieces[1], 1)
-                
-                # rotate pi:
+                newSquares = np.array([np.rot90(squares[0], 1), np.rot90(squares[1], 1)])
                 newPi0 = self.rotate(Pi0)
                 newPi1 = self.rotate(Pi1)
-                
-                
-                # We will record  var_, which may be modified by a flip, but
-                # reinitialize the next rotation/flip with var to get all syms:
-                # rotate, rotate+flip, rotate^2, rotate^2+flip, 
-                # rotate^3, rotate^3+flip, rotate^4=Identity, rotate^4+flip
-                newB0_          = newB0
-                newB1_          = newB1
-                newPi0_         = newPi0
-                newPi1_         = newPi1
                 if k:
-                    # flip board: 
-                    newB0_ = np.fliplr(newB0)
-                    newB1_ = np.fliplr(newB1)
-                    
-                    # flip pi:
-                    newPi0_ = self.flip(Pi0)
-                    newPi1_ = self.flip(Pi1)
-                                        
-                newPi = np.ravel([newPi0_, newPi1_])
-                
-                # record the symmetry
-                syms += [(np.array([newB0_, newB1_]), list(newPi))]        
-        
-                # reset the board as the rotated one values with the new values
-                b.pieces[0] = np.copy(newB0)
-                b.pieces[1] = np.copy(newB1)
+                    boardPerms.append(np.array([np.fliplr(newSquares[0]), np.fliplr(newSquares[1])]).ravel())
+                    actionPerms.append(self.flip(Pi0) + self.flip(Pi1))
+                else:
+                    boardPerms.append(newSquares.ravel())
+                    actionPerms.append(newPi0 + newPi1)
+                squares = newSquares
                 Pi0 = newPi0
                 Pi1 = newPi1
-                
-        return syms        
+        return np.array(boardPerms), np.array(actionPerms)
                 
     def rotate(self, pi_64):
         """
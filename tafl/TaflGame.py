@@ -2,16 +2,29 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from utils import dihedralPermutations
 from .TaflLogic import Board
 import numpy as np
 from .GameVariants import *
-from .Digits import int2base
+
+# (dx,dy) of the 4 directions of the compact action encoding
+DIRECTIONS = [(1,0),(-1,0),(0,1),(0,-1)]
+DIRECTION_INDEX = np.zeros((3,3), dtype=int)  # [sign(dx)+1][sign(dy)+1] -> index in DIRECTIONS
+for i, (dx, dy) in enumerate(DIRECTIONS):
+    DIRECTION_INDEX[dx+1, dy+1] = i
 
 class TaflGame(Game):
 
-    def __init__(self, name):
+    def __init__(self, name, compactActions=False):
         self.name = name
+        # encode actions as from-square x direction x distance (see encodeMove)
+        # instead of the n**4 (x1,y1,x2,y2) tuples
+        self.compactActions = compactActions
         self.getInitBoard()
+        if compactActions:
+            # getSymmetries moves the pieces by boardPerms and permutes pi by actionPerms
+            self.boardPerms = dihedralPermutations(self.n)
+            self.actionPerms = self._getActionPerms()
 
     def getInitBoard(self):    
         board=Board(Brandubh())
@@ -31,28 +44,47 @@ class TaflGame(Game):
 
     def getActionSize(self):
         # return number of actions
+        if self.compactActions:
+            return self.n*self.n*len(DIRECTIONS)*(self.n-1)
         return self.n**4 
 
+    def encodeMove(self, move):
+        # returns the action of move [x1,y1,x2,y2], or the actions of a list of moves
+        x1,y1,x2,y2 = np.array(move, dtype=int).T
+        if not self.compactActions:
+            return x1+y1*self.n+x2*self.n**2+y2*self.n**3
+        direction = DIRECTION_INDEX[np.sign(x2-x1)+1, np.sign(y2-y1)+1]
+        distance = abs(x2-x1)+abs(y2-y1)
+        return ((x1+y1*self.n)*len(DIRECTIONS)+direction)*(self.n-1)+distance-1
+
+    def decodeAction(self, action):
+        # returns the move [x1,y1,x2,y2] of action, inverse of encodeMove
+        if not self.compactActions:
+            return [int(action)//self.n**i%self.n for i in range(4)]
+        square, rest = divmod(int(action), len(DIRECTIONS)*(self.n-1))
+        direction, distance = divmod(rest, self.n-1)
+        x1, y1 = square%self.n, square//self.n
+        dx, dy = DIRECTIONS[direction]
+        return [x1, y1, x1+dx*(distance+1), y1+dy*(distance+1)]
+
     def getNextState(self, board, player, action):
         # if player takes action on board, return next (board,player)
         # action must be a valid move
         b = board.getCopy()
-        move = int2base(action,self.n,4)
+        move = self.decodeAction(action)
         b.execute_move(move, player)
         return (b, -player)
 
     def getValidMoves(self, board, player):
         # return a fixed size binary vector
         #Note: Ignoreing the passed in player variable since we are not inverting colors for getCanonicalForm and Arena calls with constant 1.
-        valids = [0]*self.getActionSize()
-        b = board.getCopy()
-        legalMoves =  b.get_legal_moves(board.getPlayerToMove())
+        valids = np.zeros(self.getActionSize(), dtype=int)
+        legalMoves =  board.get_legal_moves(board.getPlayerToMove())
         if len(legalMoves)==0:
             valids[-1]=1
-            return np.array(valids)
-        for x1, y1, x2, y2 in legalMoves:
-            valids[x1+y1*self.n+x2*self.n**2+y2*self.n**3]=1
-        return np.array(valids)
+            return valids
+        valids[self.encodeMove(legalMoves)]=1
+        return valids
 
     def getGameEnded(self, board, player):
         # return 0 if not ended, if player 1 won, -1 if player 1 lost
@@ -64,6 +96,15 @@ class TaflGame(Game):
         return b
 
     def getSymmetries(self, board, pi):
+        if self.compactActions:
+            # the 8 rotations and reflections of the board, which all variants are invariant under
+            pi = np.asarray(pi)
+            if isinstance(board, np.ndarray):
+                # a board image, as stored by ReplayBuffer: image[y][x] is square x+y*n
+                return [(board.ravel()[perm].reshape(board.shape), pi[actionPerm])
+                        for perm, actionPerm in zip(self.boardPerms, self.actionPerms)]
+            return [(board.getTransformed(perm), pi[actionPerm])
+                    for perm, actionPerm in zip(self.boardPerms, self.actionPerms)]
         return [(board,pi)]
         # mirror, rotational
         #assert(len(pi) == self.n**4)  
@@ -84,6 +125,31 @@ class TaflGame(Game):
         #print("->",str(board))
         return str(board)
 
+    def hashState(self, board):
+        # zobrist hash, updated incrementally by Board.execute_move
+        return board.hash
+
+    def _getActionPerms(self):
+        # actionPerms[k][a] is the action that becomes action a in the kth symmetry
+        n = self.n
+        actions = np.arange(self.getActionSize())
+        square, rest = np.divmod(actions, len(DIRECTIONS)*(n-1))
+        direction, distance = np.divmod(rest, n-1)
+        actionPerms = []
+        for perm in self.boardPerms:
+            newSquare = np.argsort(perm)  # square x+y*n moves to newSquare[x+y*n]
+            # the direction from the centre to its neighbour in the symmetric board
+            c = n//2 + n//2*n
+            newDirection = []
+            for dx, dy in DIRECTIONS:
+                y, x = divmod(int(newSquare[c+dx+dy*n]) - int(newSquare[c]) + n + 1, n)
+                newDirection.append(DIRECTIONS.index((x-1, y-1)))
+            newActions = (newSquare[square]*len(DIRECTIONS)+np.array(newDirection)[direction])*(n-1)+distance
+            actionPerm = np.empty_like(actions)
+            actionPerm[newActions] = actions
+            actionPerms.append(actionPerm)
+        return np.array(actionPerms)
+
     def getScore(self, board, player):
         if board.done: return 1000*board.done*player
         return board.countDiff(player)
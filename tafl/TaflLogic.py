@@ -1,50 +1,90 @@
+import copy
 import numpy as np
 from .GameVariants import Tafl
+from utils import zobristTable
+
+PIECE_INDEX = {-1: 0, 1: 1, 2: 2}  # piece type -> index in the zobrist table
+SIDE_KEY = zobristTable(1)[0]  # xor-ed into the hash when black is to move
+_zobrist = {}  # board size -> zobrist table of [x][y][piece index]
+
+def getZobrist(size):
+    if size not in _zobrist:
+        _zobrist[size] = zobristTable(size, size, len(PIECE_INDEX))
+    return _zobrist[size]
+
+_rays = {}  # board size -> [x][y] -> the 4 lists of squares going away from (x,y) to the edge
+
+def getRays(size):
+    if size not in _rays:
+        _rays[size] = [[[[(x+dx*i,y+dy*i) for i in range(1,size) if 0 <= x+dx*i < size and 0 <= y+dy*i < size]
+                         for dx,dy in [(1,0),(-1,0),(0,1),(0,-1)]]
+                        for y in range(size)] for x in range(size)]
+    return _rays[size]
 
 class Board():
+    """
+    The pieces are kept in an array of [x,y,type] rows (x is -99 once captured), the
+    special squares of the variant in an array squares[x,y] of their type (0 for none),
+    and the index of the piece on each square in pieceAt[x,y] (-1 for none), so that
+    moves and captures look squares up instead of scanning the pieces.
+    """
 
+    # list of the 4 directions a piece moves in, as (x,y) offsets
+    __directions = [(1,0),(-1,0),(0,1),(0,-1)]
 
-    def __init__(self, gv):
+    def __init__(self, gv, key=None):
       self.size=gv.size  
       self.width=gv.size
       self.height=gv.size
-      self.board=gv.board #[x,y,type]
-      self.pieces=gv.pieces #[x,y,type]
+      self.board=np.array(gv.board, dtype=int).reshape(-1,3) #[x,y,type]
+      self.pieces=np.array(gv.pieces, dtype=int).reshape(-1,3) #[x,y,type]
+      self.squares=np.zeros((self.width,self.height), dtype=int)
+      self.squares[self.board[:,0],self.board[:,1]]=self.board[:,2]
+      self.squareList=self.squares.tolist()
+      self.pieceAt=np.full((self.width,self.height), -1, dtype=int)
+      alive=np.flatnonzero(self.pieces[:,0]>=0)
+      self.pieceAt[self.pieces[alive,0],self.pieces[alive,1]]=alive
       self.time=0
       self.done=0
+      self.hash=self._getHash() if key is None else key #zobrist hash of the pieces and the player to move
 
     def __str__(self):
         return str(self.getPlayerToMove()) + ''.join(str(r) for v in self.getImage() for r in v) 
 
     # add [][] indexer syntax to the Board
     def __getitem__(self, index): 
-        return np.array(self.getImage())[index]
+        return self.getImage()[index]
 
     def astype(self,t):
-        return np.array(self.getImage()).astype(t)
+        return self.getImage().astype(t)
 
     def getCopy(self):
+      b = copy.copy(self)  # the special squares never change and are shared
+      b.pieces=self.pieces.copy()
+      b.pieceAt=self.pieceAt.copy()
+      return b
+
+
+    def getTransformed(self, perm):
+      """Returns a copy of the board under a symmetry, given as in utils.dihedralPermutations:
+      the square x+y*size of the copy shows the square perm[x+y*size] of this board."""
+      newSquare=np.argsort(perm)
       gv=Tafl()
       gv.size=self.size
-      gv.board=np.copy(np.array(self.board)).tolist()
-      gv.pieces=np.copy(np.array(self.pieces)).tolist()
+      gv.board=[[*divmod(int(newSquare[x+y*self.size]),self.size)[::-1],t] for x,y,t in self.board]
+      gv.pieces=[[*divmod(int(newSquare[x+y*self.size]),self.size)[::-1],t] if x>=0 else [x,y,t]
+                 for x,y,t in self.pieces]
       b = Board(gv)
       b.time=self.time
       b.done=self.done
+      b.hash=b._getHash()
       return b
 
-
     def countDiff(self, color):
         """Counts the # pieces of the given color
         (1 for white, -1 for black, 0 for empty spaces)"""
-        count = 0
-        for p in self.pieces:
-            if p[0] >= 0:
-               if p[2]*color > 0:
-                   count += 1
-               else:
-                   count -= 1
-        return count
+        alive = self.pieces[self.pieces[:,0] >= 0, 2]
+        return int(np.sum(np.where(alive*color > 0, 1, -1)))
 
     def get_legal_moves(self, color):
         """Returns all the legal moves for the given color.
@@ -72,12 +112,9 @@ class Board():
            #print("Illegal move:",move,legal)
    
     def getImage(self):
-        image = [[0 for col in range(self.width)] for row in range(self.height)]
-        for item in self.board:
-            image[item[1]][item[0]] = item[2]*10
-        for piece in self.pieces:
-            if piece[0] >= 0: image[piece[1]][piece[0]] = piece[2] + image[piece[1]][piece[0]]
-        return image
+        # image[y][x]: 10 * the type of the special square + the type of the piece on it
+        types = np.where(self.pieceAt >= 0, self.pieces[self.pieceAt,2], 0)
+        return (self.squares*10 + types).T
 
     def getPlayerToMove(self):
         return -(self.time%2*2-1)
@@ -86,49 +123,34 @@ class Board():
 ################## Internal methods ##################
 
     def _isLegalMove(self,pieceno,x2,y2):
-      try:
-
-         if x2 < 0 or y2 < 0 or x2 >= self.width or y2 > self.height: return -1
+         if pieceno < 0: return -6 #no piece on the square
+         if x2 < 0 or y2 < 0 or x2 >= self.width or y2 >= self.height: return -1
          
-         piece = self.pieces[pieceno]
-         x1=piece[0]
-         y1=piece[1]
+         x1,y1,piecetype = self.pieces[pieceno]
          if x1<0: return -2 #piece was captured
          if x1 != x2 and y1 != y2: return -3 #must move in straight line
          if x1 == x2 and y1 == y2: return -4 #no move
 
-         piecetype = piece[2]
          if (piecetype == -1 and self.time%2 == 0) or (piecetype != -1 and self.time%2 == 1): return -5 #wrong player
 
-         for item in self.board:
-            if item[0] == x2 and item[1] == y2 and item[2] > 0:
-                if piecetype != 2: return -10 #forbidden space
-         for apiece in self.pieces:
-            if y1==y2 and y1 == apiece[1] and ((x1 < apiece[0] and x2 >= apiece[0]) or (x1 > apiece[0] and x2 <= apiece[0])): return -20 #interposing piece
-            if x1==x2 and x1 == apiece[0] and ((y1 < apiece[1] and y2 >= apiece[1]) or (y1 > apiece[1] and y2 <= apiece[1])): return -20 #interposing piece
+         if self.squares[x2,y2] > 0 and piecetype != 2: return -10 #forbidden space
+         dx, dy = np.sign(x2-x1), np.sign(y2-y1)
+         if (self.pieceAt[min(x1+dx,x2):max(x1+dx,x2)+1,min(y1+dy,y2):max(y1+dy,y2)+1] >= 0).any(): return -20 #interposing piece
 
          return 0 # legal move
-      except Exception as ex:
-         print("error in islegalmove ",ex,pieceno,x2,y2)
-         raise
 
    
     def _getCaptures(self,pieceno,x2,y2):
        #Assumes was already checked for legal move
+       #an enemy next to x2,y2 is captured when a friendly piece stands behind it
        captures=[]
-       piece=self.pieces[pieceno]
-       piecetype = piece[2]
-       for apiece in self.pieces:
-          if piecetype*apiece[2] < 0:
-             d1 = apiece[0]-x2 
-             d2 = apiece[1]-y2
-             if (abs(d1)==1 and d2==0) or (abs(d2)==1 and d1==0): 
-                 for bpiece in self.pieces:
-                    if piecetype*bpiece[2] > 0 and not(piece[0]==bpiece[0] and piece[1]==bpiece[1]):
-                       e1 = bpiece[0]-apiece[0]
-                       e2 = bpiece[1]-apiece[1]
-                       if d1==e1 and d2==e2:
-                          captures.extend([apiece])
+       piecetype = self.pieces[pieceno,2]
+       for dx,dy in self.__directions:
+          if 0 <= x2+2*dx < self.width and 0 <= y2+2*dy < self.height:
+             a = self.pieceAt[x2+dx,y2+dy]
+             b = self.pieceAt[x2+2*dx,y2+2*dy]
+             if a >= 0 and b >= 0 and piecetype*self.pieces[a,2] < 0 and piecetype*self.pieces[b,2] > 0:
+                captures.append(a)
        return captures
 
     # returns code for invalid mode (<0) or number of pieces captured
@@ -140,11 +162,19 @@ class Board():
       self.time = self.time + 1
 
       piece=self.pieces[pieceno]
+      zobrist=getZobrist(self.size)
+      t=PIECE_INDEX[piece[2]]
+      self.hash ^= zobrist[piece[0]][piece[1]][t] ^ zobrist[x2][y2][t] ^ SIDE_KEY
+      self.pieceAt[piece[0],piece[1]]=-1
+      self.pieceAt[x2,y2]=pieceno
       piece[0]=x2
       piece[1]=y2
       caps = self._getCaptures(pieceno,x2,y2)
       #print("Captures = ",caps)
       for c in caps:
+          c=self.pieces[c]
+          self.hash ^= zobrist[c[0]][c[1]][PIECE_INDEX[c[2]]]
+          self.pieceAt[c[0],c[1]]=-1
           c[0]=-99
 
       self.done = self._getWinLose()
@@ -153,33 +183,38 @@ class Board():
         
 
 
+    def _getHash(self):
+       zobrist=getZobrist(self.size)
+       h = SIDE_KEY if self.getPlayerToMove() == -1 else 0
+       for piece in self.pieces:
+           if piece[0] >= 0: h ^= zobrist[piece[0]][piece[1]][PIECE_INDEX[piece[2]]]
+       return h
+
     def _getWinLose(self):
        if self.time > 50: return -1
        for apiece in self.pieces:
            if apiece[2]==2 and apiece[0] > -1:
-               for item in self.board:
-                 if item[0]==apiece[0] and item[1]==apiece[1] and item[2]==1:
-                     return 1 #white won
+               if self.squares[apiece[0],apiece[1]]==1:
+                   return 1 #white won
                return 0 # no winner
        return -1  #white lost
    
     def _getPieceNo(self,x,y):
-       for pieceno in range(len(self.pieces)):
-           piece=self.pieces[pieceno]
-           if piece[0]==x and piece[1]==y: return pieceno
+       if 0 <= x < self.width and 0 <= y < self.height: return int(self.pieceAt[x,y])
        return -1    
    
     def _getValidMoves(self,player):
+       #scans the rays from every piece of the player to move until they hit a piece or the edge
        moves=[]
-       for pieceno in range(len(self.pieces)):
-           piece=self.pieces[pieceno]
-           if piece[2]*player > 0:
-              #print("checking pieceno ",pieceno,piece)
-              for x in range(0,self.width):
-                  if self._isLegalMove(pieceno,x,piece[1])>=0:moves.extend([[piece[0],piece[1],x,piece[1]]])
-              for y in range(0,self.height):
-                  if self._isLegalMove(pieceno,piece[0],y)>=0:moves.extend([[piece[0],piece[1],piece[0],y]])
-       #print("moves ",moves)
+       if player != self.getPlayerToMove(): return moves
+       pieceAt=self.pieceAt.tolist()  #plain lists index faster than arrays one square at a time
+       squares=self.squareList
+       rays=getRays(self.size)
+       for x1,y1,piecetype in self.pieces.tolist():
+           if x1 < 0 or piecetype*player <= 0: continue
+           king = piecetype == 2
+           for ray in rays[x1][y1]:
+              for x2,y2 in ray:
+                  if pieceAt[x2][y2] >= 0: break
+                  if king or squares[x2][y2] == 0: moves.append([x1,y1,x2,y2])
        return moves
-
-
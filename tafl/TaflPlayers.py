@@ -1,5 +1,4 @@
 import numpy as np
-from .Digits import int2base
 
 class RandomTaflPlayer():
     def __init__(self, game):
@@ -23,13 +22,13 @@ class HumanTaflPlayer():
         m=[]
         for i in range(len(valid)):
             if valid[i]:
-                m.extend([int2base(i,self.game.n,4)])
+                m.extend([self.game.decodeAction(i)])
         print(m)    
         while True:
             a = input()
 
             x1,y1,x2,y2 = [int(x) for x in a.strip().split(' ')]
-            a = x1 + y1 * self.game.n + x2 * self.game.n**2 + y2 * self.game.n**3 
+            a = self.game.encodeMove([x1,y1,x2,y2])
             if valid[a]:
                 break
             else:
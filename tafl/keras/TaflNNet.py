@@ -25,7 +25,13 @@ class TaflNNet():
         h_conv4_flat = Flatten()(h_conv4)       
         s_fc1 = Dropout(args.dropout)(Activation('relu')(BatchNormalization(axis=1)(Dense(1024, use_bias=False)(h_conv4_flat))))  # batch_size x 1024
         s_fc2 = Dropout(args.dropout)(Activation('relu')(BatchNormalization(axis=1)(Dense(512, use_bias=False)(s_fc1))))          # batch_size x 1024
-        self.pi = Dense(self.action_size, activation='softmax', name='pi')(s_fc2)   # batch_size x self.action_size
+        if game.compactActions:
+            # one output per direction and distance on every from-square, in the order of the actions
+            moves_per_square = self.action_size // (self.board_x*self.board_y)
+            pi_conv = Conv2D(moves_per_square, 1)(h_conv2)                          # batch_size x board_x x board_y x moves_per_square
+            self.pi = Activation('softmax', name='pi')(Flatten()(pi_conv))          # batch_size x self.action_size
+        else:
+            self.pi = Dense(self.action_size, activation='softmax', name='pi')(s_fc2)   # batch_size x self.action_size
         self.v = Dense(1, activation='tanh', name='v')(s_fc2)                    # batch_size x 1
 
         self.model = Model(inputs=self.input_boards, outputs=[self.pi, self.v])
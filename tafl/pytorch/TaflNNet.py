@@ -32,7 +32,13 @@ class TaflNNet(nn.Module):
         self.fc2 = nn.Linear(1024, 512)
         self.fc_bn2 = nn.BatchNorm1d(512)
 
-        self.fc3 = nn.Linear(512, self.action_size)
+        self.compact_actions = game.compactActions
+        if self.compact_actions:
+            # one output per direction and distance on every from-square, in the order of the actions
+            self.moves_per_square = self.action_size // (self.board_x*self.board_y)
+            self.pi_conv = nn.Conv2d(args.num_channels, self.moves_per_square, 1)
+        else:
+            self.fc3 = nn.Linear(512, self.action_size)
 
         self.fc4 = nn.Linear(512, 1)
 
@@ -41,6 +47,7 @@ class TaflNNet(nn.Module):
         s = s.view(-1, 1, self.board_x, self.board_y)                # batch_size x 1 x board_x x board_y
         s = F.relu(self.bn1(self.conv1(s)))                          # batch_size x num_channels x board_x x board_y
         s = F.relu(self.bn2(self.conv2(s)))                          # batch_size x num_channels x board_x x board_y
+        features = s
         s = F.relu(self.bn3(self.conv3(s)))                          # batch_size x num_channels x (board_x-2) x (board_y-2)
         s = F.relu(self.bn4(self.conv4(s)))                          # batch_size x num_channels x (board_x-4) x (board_y-4)
         s = s.view(-1, self.args.num_channels*(self.board_x-4)*(self.board_y-4))
@@ -48,7 +55,11 @@ class TaflNNet(nn.Module):
         s = F.dropout(F.relu(self.fc_bn1(self.fc1(s))), p=self.args.dropout, training=self.training)  # batch_size x 1024
         s = F.dropout(F.relu(self.fc_bn2(self.fc2(s))), p=self.args.dropout, training=self.training)  # batch_size x 512
 
-        pi = self.fc3(s)                                                                         # batch_size x action_size
+        if self.compact_actions:
+            pi = self.pi_conv(features)                                                          # batch_size x moves_per_square x board_x x board_y
+            pi = pi.permute(0, 2, 3, 1).reshape(-1, self.action_size)                            # batch_size x action_size
+        else:
+            pi = self.fc3(s)                                                                     # batch_size x action_size
         v = self.fc4(s)                                                                          # batch_size x 1
 
         return F.log_softmax(pi, dim=1), torch.tanh(v)
@@ -0,0 +1,130 @@
+"""
+Checks the ray scan move generation of TaflLogic.Board against a square by
+square reference, and the compact (from-square x direction x distance) action
+encoding of TaflGame against the flat n**4 one, on random games.
+
+To run tests:
+pytest-3 tafl
+"""
+
+import numpy as np
+
+from .TaflGame import TaflGame
+
+
+def reference_legal_moves(board, player):
+    # every straight move of a piece of the player to move over empty squares
+    moves = []
+    if player != board.getPlayerToMove():
+        return moves
+    special = np.array(board.getImage()).T >= 10  # [x][y]
+    occupied = np.zeros((board.size, board.size), dtype=int)
+    for x, y, _ in board.pieces:
+        if x >= 0:
+            occupied[x][y] = 1
+    for x1, y1, piecetype in board.pieces:
+        if x1 < 0 or piecetype * player <= 0:
+            continue
+        for x2 in range(board.size):
+            for y2 in range(board.size):
+                if (x1 == x2) == (y1 == y2):
+                    continue
+                path = occupied[min(x1, x2):max(x1, x2) + 1, min(y1, y2):max(y1, y2) + 1]
+                if path.sum() != 1 or (special[x2][y2] and piecetype != 2):
+                    continue
+                moves.append([x1, y1, x2, y2])
+    return sorted(moves)
+
+
+def test_ray_scan_moves_match_reference():
+    rng = np.random.RandomState(2)
+    for name in ("Brandubh", "ArdRi", "Tablut", "Hnefatafl"):
+        game = TaflGame(name)
+        board = game.getInitBoard()
+        while not board.done:
+            for player in (1, -1):
+                moves = sorted(list(map(int, move)) for move in board.get_legal_moves(player))
+                assert moves == reference_legal_moves(board, player)
+            alive = board.pieces[board.pieces[:, 0] >= 0]
+            assert np.array_equal(board.pieceAt[alive[:, 0], alive[:, 1]], np.flatnonzero(board.pieces[:, 0] >= 0))
+            assert (board.pieceAt >= 0).sum() == len(alive)
+            board, _ = game.getNextState(board, 1, rng.choice(np.flatnonzero(game.getValidMoves(board, 1))))
+
+
+def legal_moves(game, board):
+    return sorted(game.decodeAction(a) for a in np.flatnonzero(game.getValidMoves(board, 1)))
+
+
+def test_compact_actions_match_flat_ones():
+    rng = np.random.RandomState(0)
+    for name in ("Brandubh", "Tablut", "Hnefatafl"):
+        flat, compact = TaflGame(name), TaflGame(name, compactActions=True)
+        assert compact.getActionSize() == compact.n**2 * 4 * (compact.n - 1)
+        board = compact.getInitBoard()
+        while not board.done:
+            valids = compact.getValidMoves(board, 1)
+            assert legal_moves(compact, board) == legal_moves(flat, board)
+            action = rng.choice(np.flatnonzero(valids))
+            assert compact.encodeMove(compact.decodeAction(action)) == action
+            nextBoard, nextPlayer = compact.getNextState(board, 1, action)
+            expectedBoard, _ = flat.getNextState(board, 1, flat.encodeMove(compact.decodeAction(action)))
+            assert str(nextBoard) == str(expectedBoard)
+            assert nextBoard.hash == expectedBoard.hash
+            board = nextBoard
+
+
+def test_symmetries():
+    rng = np.random.RandomState(1)
+    game = TaflGame("Tablut", compactActions=True)
+    board = game.getInitBoard()
+    for _ in range(10):
+        board, _ = game.getNextState(board, 1, rng.choice(np.flatnonzero(game.getValidMoves(board, 1))))
+    pi = rng.rand(game.getActionSize())
+    valids = game.getValidMoves(board, 1)
+    syms = game.getSymmetries(board, pi)
+    assert len(syms) == 8
+    for (symBoard, symPi), perm, actionPerm in zip(syms, game.boardPerms, game.actionPerms):
+        assert np.array_equal(np.array(symBoard.getImage()).ravel(), np.array(board.getImage()).ravel()[perm])
+        assert np.array_equal(game.getValidMoves(symBoard, 1), valids[actionPerm])
+        assert np.array_equal(symPi, pi[actionPerm])
+
+    # boards read back from a ReplayBuffer are images, which get the same symmetries
+    for (symImage, symPi), (symBoard, expectedPi) in zip(game.getSymmetries(board.astype(np.float32), pi), syms):
+        assert np.array_equal(symImage, symBoard.astype(np.float32))
+        assert np.array_equal(symPi, expectedPi)
+
+
+def test_incremental_hash_matches_recompute():
+    rng = np.random.RandomState(3)
+    captures = 0
+    for name in ("Brandubh", "Tablut", "Hnefatafl"):
+        game = TaflGame(name, compactActions=True)
+        board = game.getInitBoard()
+        assert board.hash == board._getHash()
+        while not board.done:
+            action = rng.choice(np.flatnonzero(game.getValidMoves(board, 1)))
+            nextBoard, _ = game.getNextState(board, 1, action)
+            captures += (nextBoard.pieces[:, 0] < 0).sum() - (board.pieces[:, 0] < 0).sum()
+            assert nextBoard.hash == nextBoard._getHash()
+            for symBoard, _ in game.getSymmetries(nextBoard, np.zeros(game.getActionSize())):
+                assert symBoard.hash == symBoard._getHash()
+            board = nextBoard
+    assert captures > 0
+
+
+def test_illegal_moves_leave_the_board_unchanged():
+    rng = np.random.RandomState(4)
+    game = TaflGame("Tablut")
+    board = game.getInitBoard()
+    for _ in range(10):
+        board, _ = game.getNextState(board, 1, rng.choice(np.flatnonzero(game.getValidMoves(board, 1))))
+    legal = {tuple(map(int, move)) for move in board.get_legal_moves(board.getPlayerToMove())}
+    empty = np.argwhere(board.pieceAt < 0)
+    illegal = [(x1, y1, x1, (y1 + 1) % board.size) for x1, y1 in empty[:5]]  # from an empty square
+    illegal += [move for move in (tuple(rng.randint(board.size, size=4)) for _ in range(200)) if move not in legal]
+    for move in illegal:
+        b = board.getCopy()
+        b.execute_move(move, board.getPlayerToMove())
+        assert np.array_equal(b.pieces, board.pieces)
+        assert np.array_equal(b.pieceAt, board.pieceAt)
+        assert (b.hash, b.time, b.done) == (board.hash, board.time, board.done)
@@ -0,0 +1,44 @@
+"""
+Tests for ParallelArena. These only need numpy: random players and a dummy
+network stand in for the real ones.
+
+To run tests:
+python -m pytest test_arena.py
+"""
+
+import unittest
+
+from Arena import ParallelArena
+from Coach import MCTSPlayerFactory
+from test_coach import DummyNNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from tictactoe.TicTacToePlayers import RandomPlayer
+from utils import *
+
+
+def randomPlayer(game):
+    return RandomPlayer(game).play
+
+
+class TestParallelArena(unittest.TestCase):
+
+    def test_seeded_results_do_not_depend_on_workers(self):
+        game = TicTacToeGame()
+        results = [ParallelArena(randomPlayer, randomPlayer, game, numWorkers, seed=3).playGames(20)
+                   for numWorkers in (1, 2, 4)]
+        self.assertEqual(sum(results[0]), 20)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_mcts_players(self):
+        game = TicTacToeGame()
+        args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0})
+        factory = MCTSPlayerFactory(DummyNNet, None, None, args)
+        results = [ParallelArena(factory, randomPlayer, game, numWorkers, seed=5).playGames(6)
+                   for numWorkers in (1, 3)]
+        self.assertEqual(sum(results[0]), 6)
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
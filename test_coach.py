@@ -0,0 +1,182 @@
+"""
+Tests for the self-play side of Coach. These only need numpy: a deterministic
+dummy network stands in for the real ones.
+
+To run tests:
+python -m pytest test_coach.py
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import zlib
+from pickle import Pickler
+
+import numpy as np
+
+from Coach import Coach
+from NeuralNet import NeuralNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import *
+
+
+class DummyNNet(NeuralNet):
+    """Returns a fixed pseudo-random (pi, v) for every board, has no weights."""
+
+    def __init__(self, game):
+        self.action_size = game.getActionSize()
+
+    def predict(self, board):
+        rng = np.random.RandomState(zlib.crc32(np.asarray(board).tobytes()))
+        pi = rng.rand(self.action_size)
+        return pi / np.sum(pi), np.array([2 * rng.rand() - 1])
+
+
+class TestCoach(unittest.TestCase):
+
+    def self_play(self, **kwargs):
+        game = TicTacToeGame()
+        args = dotdict({'numEps': 6, 'numMCTSSims': 6, 'cpuct': 1.0, 'tempThreshold': 15,
+                        'checkpoint': tempfile.mkdtemp(), 'seed': 7})
+        args.update(kwargs)
+        coach = Coach(game, DummyNNet(game), args)
+        return [[(b.tolist(), list(p), v) for b, p, v in episode] for episode in coach.selfPlay(1)]
+
+    def test_workers_match_single_process(self):
+        single = self.self_play()
+        self.assertEqual(6, len(single))
+        self.assertEqual(single, self.self_play(numSelfPlayWorkers=3))
+
+    def test_inference_server_matches_single_process(self):
+        self.assertEqual(self.self_play(), self.self_play(numSelfPlayWorkers=3, inferenceServer=True))
+
+    def test_evaluation_cache_matches_uncached(self):
+        self.assertEqual(self.self_play(), self.self_play(evalCacheSize=1000))
+        self.assertEqual(self.self_play(), self.self_play(numSelfPlayWorkers=2, evalCacheSize=1000))
+
+    def test_lockstep_games(self):
+        episodes = self.self_play(numLockstepGames=4)
+        self.assertEqual(len(episodes), 6)
+        self.assertEqual(episodes, self.self_play(numLockstepGames=4))
+
+    def test_learn_with_replay_buffer(self):
+        game = TicTacToeGame()
+        args = dotdict({'numIters': 3, 'numEps': 2, 'numMCTSSims': 4, 'cpuct': 1.0, 'tempThreshold': 15,
+                        'maxlenOfQueue': 1000, 'numItersForTrainExamplesHistory': 2, 'arenaCompare': 2,
+                        'updateThreshold': 0.6, 'checkpoint': tempfile.mkdtemp(), 'replayBuffer': True})
+        coach = Coach(game, DummyNNet(game), args)
+        coach.learn()
+        self.assertEqual(coach.replayBuffer.iterations(), [2, 3])
+        self.assertGreater(len(coach.replayBuffer), 0)
+
+    def test_resume_with_replay_buffer(self):
+        game = TicTacToeGame()
+        folder = tempfile.mkdtemp()
+        args = dotdict({'numIters': 3, 'numEps': 2, 'numMCTSSims': 4, 'cpuct': 1.0, 'tempThreshold': 15,
+                        'maxlenOfQueue': 1000, 'numItersForTrainExamplesHistory': 2, 'arenaCompare': 2,
+                        'updateThreshold': 0.6, 'checkpoint': folder, 'replayBuffer': True})
+        Coach(game, DummyNNet(game), args).learn()
+
+        # resuming in the same folder adds the new shards after the old ones
+        args.numIters = 2
+        args.load_folder_file = (folder, 'best.pth.tar')
+        resumed = Coach(game, DummyNNet(game), args)
+        resumed.loadTrainExamples()
+        self.assertTrue(resumed.skipFirstSelfPlay)
+        resumed.learn()
+        self.assertEqual(resumed.replayBuffer.iterations(), [3, 4])
+
+        # resuming from another folder copies its shards to the checkpoint folder
+        args.checkpoint = tempfile.mkdtemp()
+        moved = Coach(game, DummyNNet(game), args)
+        moved.loadTrainExamples()
+        self.assertEqual(moved.replayBuffer.folder, os.path.join(args.checkpoint, 'replay'))
+        self.assertEqual(moved.replayBuffer.iterations(), [3, 4])
+        moved.learn()
+        self.assertEqual(moved.replayBuffer.iterations(), [4, 5])
+        self.assertEqual(resumed.replayBuffer.iterations(), [3, 4])
+
+    def test_incremental_examples(self):
+        game = TicTacToeGame()
+        folder = tempfile.mkdtemp()
+        args = dotdict({'numIters': 3, 'numEps': 2, 'numMCTSSims': 4, 'cpuct': 1.0, 'tempThreshold': 15,
+                        'maxlenOfQueue': 1000, 'numItersForTrainExamplesHistory': 2, 'arenaCompare': 2,
+                        'updateThreshold': 0.6, 'checkpoint': folder, 'incrementalExamples': True})
+        coach = Coach(game, DummyNNet(game), args)
+        coach.learn()
+        self.assertEqual(coach.historySegments, ['checkpoint_1.pth.tar.examples.2.segment',
+                                                 'checkpoint_2.pth.tar.examples.3.segment'])
+
+        args.load_folder_file = (folder, 'checkpoint_2.pth.tar')
+        resumed = Coach(game, DummyNNet(game), args)
+        resumed.loadTrainExamples()
+        self.assertTrue(resumed.skipFirstSelfPlay)
+        self.assertEqual(resumed.historySegments, coach.historySegments)
+        self.assertEqual([[(b.tolist(), list(p), v) for b, p, v in e] for e in resumed.trainExamplesHistory],
+                         [[(b.tolist(), list(p), v) for b, p, v in e] for e in coach.trainExamplesHistory])
+
+    def test_incremental_examples_resumed_in_same_folder(self):
+        game = TicTacToeGame()
+        folder = tempfile.mkdtemp()
+        args = dotdict({'numIters': 3, 'numEps': 2, 'numMCTSSims': 4, 'cpuct': 1.0, 'tempThreshold': 15,
+                        'maxlenOfQueue': 1000, 'numItersForTrainExamplesHistory': 3, 'arenaCompare': 2,
+                        'updateThreshold': 0.6, 'checkpoint': folder, 'incrementalExamples': True})
+        Coach(game, DummyNNet(game), args).learn()
+
+        def manifest(iteration):
+            with open(os.path.join(folder, 'checkpoint_%d.pth.tar.examples.manifest' % iteration)) as f:
+                return json.load(f)['segments']
+
+        def loaded(iteration):
+            loadArgs = dotdict(args, load_folder_file=(folder, 'checkpoint_%d.pth.tar' % iteration))
+            coach = Coach(game, DummyNNet(game), loadArgs)
+            coach.loadTrainExamples()
+            return [[(b.tolist(), list(p), v) for b, p, v in e] for e in coach.trainExamplesHistory]
+
+        firstSegments, firstExamples = manifest(2), loaded(2)
+
+        args.numIters = 2
+        args.load_folder_file = (folder, 'checkpoint_2.pth.tar')
+        resumed = Coach(game, DummyNNet(game), args)
+        resumed.loadTrainExamples()
+        resumed.learn()
+
+        # the second run saved its segment under a new name, the first run's manifests still load the same examples
+        segments = manifest(1)
+        self.assertEqual(segments[:2], firstSegments[1:])
+        self.assertNotIn(segments[2], firstSegments)
+        self.assertEqual(loaded(1)[:2], firstExamples[1:])
+        self.assertEqual((manifest(2), loaded(2)), (firstSegments, firstExamples))
+
+    def test_incremental_examples_from_legacy_file(self):
+        game = TicTacToeGame()
+        folder = tempfile.mkdtemp()
+        history = [[(np.full((3, 3), k), np.full(10, 0.1 * k), 1)] for k in range(3)]
+        with open(os.path.join(folder, 'checkpoint_4.pth.tar.examples'), "wb+") as f:
+            Pickler(f).dump(history)
+        args = dotdict({'checkpoint': folder, 'incrementalExamples': True,
+                        'load_folder_file': (folder, 'checkpoint_4.pth.tar')})
+        coach = Coach(game, DummyNNet(game), args)
+        coach.loadTrainExamples()
+        coach.saveTrainExamples(4)
+        self.assertEqual(len(set(coach.historySegments)), 3)
+
+        resumed = Coach(game, DummyNNet(game), args)
+        resumed.loadTrainExamples()
+        self.assertEqual(resumed.historySegments, coach.historySegments)
+        self.assertEqual([[(b.tolist(), list(p), v) for b, p, v in e] for e in resumed.trainExamplesHistory],
+                         [[(b.tolist(), list(p), v) for b, p, v in e] for e in history])
+
+    def test_lazy_symmetries(self):
+        eager, lazy = self.self_play(), self.self_play(lazySymmetries=True)
+        # the identity is the last of the 8 symmetries TicTacToeGame.getSymmetries returns
+        self.assertEqual(lazy, [episode[7::8] for episode in eager])
+
+    def test_episodes_differ_without_seed(self):
+        episodes = self.self_play(numSelfPlayWorkers=2, seed=None)
+        self.assertTrue(any(episode != episodes[0] for episode in episodes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the network evaluation cache. These only need numpy: a dummy
+network stands in for the real ones.
+
+To run tests:
+python -m pytest test_evaluation_cache.py
+"""
+
+import unittest
+
+import numpy as np
+
+from EvaluationCache import CachedNNet, EvaluationCache
+from MCTS import MCTS
+from test_mcts import CountingNNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import *
+
+
+class TestEvaluationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.game = TicTacToeGame()
+        self.board = self.game.getInitBoard()
+        self.board, _ = self.game.getNextState(self.board, 1, 0)
+        self.board, _ = self.game.getNextState(self.board, -1, 5)  # no symmetry maps it onto itself
+
+    def test_lru_eviction(self):
+        cache = EvaluationCache(maxSize=2)
+        cache.store(0, 'a', None, 0.)
+        cache.store(0, 'b', None, 0.)
+        cache.lookup(0, 'a')
+        cache.store(0, 'c', None, 0.)
+        self.assertIsNotNone(cache.lookup(0, 'a'))
+        self.assertIsNone(cache.lookup(0, 'b'))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_versions_are_separate(self):
+        cache = EvaluationCache()
+        nnet = CountingNNet(self.game)
+        CachedNNet(self.game, nnet, 0, cache=cache).predict(self.board)
+        CachedNNet(self.game, nnet, 0, cache=cache).predict(self.board)
+        CachedNNet(self.game, nnet, 1, cache=cache).predict(self.board)
+        self.assertEqual(nnet.batch_sizes, [1, 1])
+
+        cache.invalidate(keepVersion=1)
+        self.assertEqual(list(cache.entries), [(1, self.game.stringRepresentation(self.board))])
+
+    def test_symmetric_lookup(self):
+        cache = EvaluationCache()
+        nnet = CountingNNet(self.game)
+        cached = CachedNNet(self.game, nnet, 0, symmetries=True, cache=cache)
+        pi, v = cached.predict(self.board)
+        for symBoard, symPi in self.game.getSymmetries(self.board, pi):
+            cachedPi, cachedV = cached.predict(symBoard)
+            np.testing.assert_array_equal(cachedPi, symPi)
+            self.assertEqual(cachedV, v)
+        self.assertEqual(nnet.batch_sizes, [1])
+        self.assertEqual((cache.hits, cache.misses), (8, 1))
+
+    def test_symmetric_hits_are_recent(self):
+        cache = EvaluationCache(maxSize=2)
+        cached = CachedNNet(self.game, CountingNNet(self.game), 0, symmetries=True, cache=cache)
+        cached.predict(self.board)
+        other, _ = self.game.getNextState(self.board, 1, 4)
+        cached.predict(other)
+        cached.predict(np.rot90(self.board))  # a symmetric hit makes self.board the most recent entry
+        cached.predict(self.game.getNextState(other, -1, 8)[0])
+        self.assertIn((0, self.game.stringRepresentation(self.board)), cache.entries)
+        self.assertNotIn((0, self.game.stringRepresentation(other)), cache.entries)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_search_matches_uncached(self):
+        args = dotdict({'numMCTSSims': 50, 'cpuct': 1})
+        canonicalBoard = self.game.getCanonicalForm(self.board, -1)
+        expected = MCTS(self.game, CountingNNet(self.game), args).getActionProb(canonicalBoard)
+
+        nnet = CountingNNet(self.game)
+        cached = CachedNNet(self.game, nnet, 0, cache=EvaluationCache())
+        for _ in range(2):
+            self.assertEqual(MCTS(self.game, cached, args).getActionProb(canonicalBoard), expected)
+        self.assertEqual(len(nnet.batch_sizes), len(cached.cache.entries))
+
+
+if __name__ == '__main__':
+    unittest.main()
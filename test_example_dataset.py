@@ -0,0 +1,81 @@
+"""
+Tests for ExampleDataset. These need torch.
+
+To run tests:
+python -m pytest test_example_dataset.py
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+
+from ExampleDataset import ExampleDataset, exampleLoader
+from ReplayBuffer import ReplayBuffer
+from test_replay_buffer import makeExamples
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import SymmetricExamples, trainingEpochs
+
+
+class TestExampleDataset(unittest.TestCase):
+
+    def test_list_and_replay_examples_agree(self):
+        examples = makeExamples(10, 0)
+        buffer = ReplayBuffer(tempfile.mkdtemp(), 2)
+        buffer.addIteration(examples[:6])
+        buffer.addIteration(examples[6:])
+
+        fromList, fromBuffer = ExampleDataset(examples), ExampleDataset(buffer.examples())
+        for a, b in zip(fromList[[3, 7, 7]], fromBuffer[[3, 7, 7]]):
+            self.assertEqual(a.dtype, torch.float32)
+            self.assertTrue(torch.equal(a, b))
+        np.testing.assert_array_equal(fromList[[4]][0][0].numpy(), examples[4][0])
+
+    def test_convert_board(self):
+        dataset = ExampleDataset(makeExamples(3, 1), lambda board: board.ravel()[:4])
+        self.assertEqual(tuple(dataset.boards.shape), (3, 4))
+
+    def test_symmetric_examples(self):
+        game = TicTacToeGame()
+        examples = makeExamples(4, 4)
+        symmetric = SymmetricExamples(examples, game)
+        for (board, pi, v), (b, p, w) in zip(examples, symmetric):
+            self.assertTrue(any(np.array_equal(b, symB) and np.array_equal(p, symP)
+                                for symB, symP in game.getSymmetries(board, pi)))
+            self.assertEqual(v, w)
+
+        boards, pis, vs = ExampleDataset(symmetric)[[0, 2]]
+        self.assertEqual(tuple(boards.shape), (2, 3, 3))
+        self.assertEqual(pis.dtype, torch.float32)
+        self.assertEqual(vs.tolist(), [examples[0][2], examples[2][2]])
+
+    def test_training_epochs_draw_new_symmetries(self):
+        game = TicTacToeGame()
+        examples = makeExamples(20, 5)
+        self.assertEqual(list(trainingEpochs(examples, 3)), [(examples, 3)])
+
+        np.random.seed(0)
+        epochs = list(trainingEpochs(SymmetricExamples(examples, game), 2))
+        self.assertEqual([e for _, e in epochs], [1, 1])
+        (first, _), (second, _) = epochs
+        self.assertEqual(len(first), len(examples))
+        self.assertFalse(all(np.array_equal(a[0], b[0]) for a, b in zip(first, second)))
+        for (board, pi, v), (b, p, w) in zip(examples, second):
+            self.assertTrue(any(np.array_equal(b, symB) and np.array_equal(p, symP)
+                                for symB, symP in game.getSymmetries(board, pi)))
+            self.assertEqual(v, w)
+
+    def test_loader_batches(self):
+        loader = exampleLoader(ExampleDataset(makeExamples(10, 2)), 4)
+        batches = list(loader)
+        self.assertEqual(len(batches), 2)
+        for boards, pis, vs in batches:
+            self.assertEqual(tuple(boards.shape), (4, 3, 3))
+            self.assertEqual(tuple(pis.shape), (4, 10))
+            self.assertEqual(tuple(vs.shape), (4,))
+        self.assertEqual(list(exampleLoader(ExampleDataset(makeExamples(3, 3)), 4)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Tests for the getGameEndedAfterMove fast paths: on random games they must
+agree with getGameEnded after every move.
+
+To run tests:
+python -m pytest test_game_ended.py
+"""
+
+import copy
+import unittest
+
+import numpy as np
+
+from Arena import Arena
+from Coach import Coach
+from MCTS import MCTS
+from connect4.Connect4Game import Connect4Game
+from gobang.GobangGame import GobangGame
+from rts.RTSGame import RTSGame
+from rts.src.config_class import CONFIG
+from test_coach import DummyNNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+
+
+class TestGameEndedAfterMove(unittest.TestCase):
+
+    def assertSameResults(self, game, numGames, seed):
+        rng = np.random.RandomState(seed)
+        for _ in range(numGames):
+            board, player = game.getInitBoard(), 1
+            while True:
+                action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+                board, player = game.getNextState(board, player, action)
+                r = game.getGameEndedAfterMove(board, player, action)
+                self.assertEqual(r, game.getGameEnded(board, player))
+                if r != 0:
+                    break
+
+    def test_connect4(self):
+        self.assertSameResults(Connect4Game(), 30, 0)
+        self.assertSameResults(Connect4Game(height=4, width=5, win_length=3), 30, 1)
+
+    def test_gobang(self):
+        self.assertSameResults(GobangGame(7, 4), 20, 2)
+        self.assertSameResults(GobangGame(5, 5), 10, 3)
+
+    def test_default_falls_back_to_get_game_ended(self):
+        self.assertSameResults(TicTacToeGame(), 10, 4)
+
+    def test_rts(self):
+        # RTSGame does not inherit from Game, so it defines getGameEndedAfterMove itself
+        self.assertSameResults(RTSGame(), 1, 5)
+
+    def test_rts_self_play_and_arena(self):
+        # the root Coach, MCTS and Arena as rts/learn.py and rts/pit.py use them
+        game = RTSGame()
+        args = copy.copy(CONFIG.learn_args)
+        args.numMCTSSims = 2
+        np.random.seed(6)
+        examples = Coach(game, DummyNNet(game), args).executeEpisode()
+        self.assertGreater(len(examples), 0)
+        self.assertTrue(all(v != 0 for _, _, v in examples))
+
+        mcts = MCTS(game, DummyNNet(game), args)
+        mctsPlayer = lambda x: np.argmax(mcts.getActionProb(x, temp=0))
+        randomPlayer = lambda x: np.random.choice(np.flatnonzero(game.getValidMoves(x, 1)))
+        self.assertNotEqual(Arena(mctsPlayer, randomPlayer, game).playGame(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Tests for InferenceServer. These only need numpy: dummy networks stand in for
+the real ones.
+
+To run tests:
+python -m pytest test_inference_server.py
+"""
+
+import time
+import unittest
+
+import numpy as np
+
+from InferenceServer import InferenceServer, InferenceServerError
+from NeuralNet import NeuralNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+
+
+class SumNNet(NeuralNet):
+    """Answers every board with its sum, and has no weights."""
+
+    def __init__(self, game):
+        pass
+
+    def load_checkpoint(self, folder, filename):
+        pass
+
+    def predict_batch(self, boards):
+        sums = np.array([np.sum(board) for board in boards], dtype=float)
+        return sums[:, None], sums
+
+
+class BrokenNNet(SumNNet):
+
+    def predict_batch(self, boards):
+        raise ValueError('broken network')
+
+
+class UnloadableNNet(SumNNet):
+
+    def load_checkpoint(self, folder, filename):
+        raise IOError('no checkpoint')
+
+
+class TestInferenceServer(unittest.TestCase):
+
+    def test_batches_respect_max_batch_size(self):
+        server = InferenceServer(TicTacToeGame(), SumNNet, '', '', 3, maxBatchSize=4, maxWait=0.5)
+        server.start()
+        # queue the requests of all the clients at once, as if they were all waiting
+        sizes = {0: 3, 1: 3, 2: 10}
+        for clientId, size in sizes.items():
+            server.requests.put((clientId, time.time(), [np.full(2, clientId + k) for k in range(size)]))
+        for clientId, size in sizes.items():
+            pis, vs = server.responses[clientId].get(timeout=10)
+            self.assertEqual(list(vs), [2. * (clientId + k) for k in range(size)])
+            self.assertEqual(pis.shape, (size, 1))
+        stats = server.stop()
+        self.assertEqual(stats['boards'], 16)
+        self.assertLessEqual(stats['maxBatchSize'], 4)
+        self.assertIsNone(stats['error'])
+
+    def test_errors_reach_the_clients(self):
+        for nnetClass in (BrokenNNet, UnloadableNNet):
+            server = InferenceServer(TicTacToeGame(), nnetClass, '', '', 2)
+            server.start()
+            for clientId in (0, 1):
+                with self.assertRaises(InferenceServerError):
+                    server.getClient(clientId).predict(np.zeros((3, 3)))
+            stats = server.stop()
+            self.assertIn(nnetClass == BrokenNNet and 'broken network' or 'no checkpoint', stats['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
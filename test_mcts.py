@@ -0,0 +1,169 @@
+"""
+Tests for the array-backed MCTS. These only need numpy: a deterministic dummy
+network stands in for the real ones.
+
+To run tests:
+python -m pytest test_mcts.py
+"""
+
+import math
+import unittest
+import zlib
+
+import numpy as np
+
+from MCTS import MCTS, EPS
+from NeuralNet import NeuralNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from gobang.GobangGame import GobangGame
+from utils import *
+
+
+class DummyNNet():
+    """Returns a fixed pseudo-random (pi, v) for every board, the same in every process."""
+
+    def __init__(self, game):
+        self.action_size = game.getActionSize()
+
+    def predict(self, board):
+        rng = np.random.RandomState(zlib.crc32(np.asarray(board).tobytes()))
+        pi = rng.rand(self.action_size)
+        return pi / np.sum(pi), np.array([2 * rng.rand() - 1])
+
+
+class CountingNNet(DummyNNet, NeuralNet):
+    """DummyNNet that records the size of every batch it is asked for."""
+
+    def __init__(self, game):
+        DummyNNet.__init__(self, game)
+        self.batch_sizes = []
+
+    def predict_batch(self, boards):
+        self.batch_sizes.append(len(boards))
+        return NeuralNet.predict_batch(self, boards)
+
+
+class ScalarMCTS(MCTS):
+    """MCTS with the per-action selection loop the vectorized one replaced."""
+
+    def selectAction(self, nid):
+        cur_best = -float('inf')
+        best_act = -1
+        for a in range(self.actionSize):
+            if self.Vs[nid, a]:
+                if self.Nsa[nid, a] > 0:
+                    u = self.Qsa[nid, a] + self.args.cpuct * self.Ps[nid, a] * math.sqrt(self.Ns[nid]) / (
+                            1 + self.Nsa[nid, a])
+                else:
+                    u = self.args.cpuct * self.Ps[nid, a] * math.sqrt(self.Ns[nid] + EPS)
+                if u > cur_best:
+                    cur_best = u
+                    best_act = a
+        return best_act
+
+
+class TestMCTS(unittest.TestCase):
+
+    def test_select_action_matches_scalar(self):
+        game = TicTacToeGame()
+        args = dotdict({'numMCTSSims': 0, 'cpuct': 1.5})
+        vectorized, scalar = MCTS(game, None, args), ScalarMCTS(game, None, args)
+        rng = np.random.RandomState(0)
+        for i in range(200):
+            for mcts in (vectorized, scalar):
+                nid = mcts.newNode(i)
+            for name in ('Nsa', 'Wsa', 'Ps', 'Vs'):
+                row = rng.rand(game.getActionSize())
+                if name == 'Nsa':
+                    row = rng.randint(0, 3, size=game.getActionSize())
+                elif name == 'Vs':
+                    row = row < 0.5
+                getattr(vectorized, name)[nid] = getattr(scalar, name)[nid] = row
+            if i % 3 == 0:
+                vectorized.Ps[nid] = scalar.Ps[nid] = 1. / game.getActionSize()  # force ties
+            n = np.maximum(vectorized.Nsa[nid], 1)
+            vectorized.Qsa[nid] = scalar.Qsa[nid] = vectorized.Wsa[nid] / n
+            vectorized.Ns[nid] = scalar.Ns[nid] = np.sum(vectorized.Nsa[nid])
+            self.assertEqual(scalar.selectAction(nid), vectorized.selectAction(nid))
+
+    def test_search_matches_scalar(self):
+        for game, sims in ((TicTacToeGame(), 8), (GobangGame(7, 4), 30)):
+            args = dotdict({'numMCTSSims': sims, 'cpuct': 1.0})
+            vectorized = MCTS(game, DummyNNet(game), args)
+            scalar = ScalarMCTS(game, DummyNNet(game), args)
+            board = game.getInitBoard()
+            for step in range(4):
+                probs = vectorized.getActionProb(board, temp=1)
+                self.assertEqual(scalar.getActionProb(board, temp=1), probs)
+                board, player = game.getNextState(board, 1, int(np.argmax(probs)))
+                board = game.getCanonicalForm(board, player)
+            self.assertEqual(vectorized.nodes, scalar.nodes)
+            self.assertTrue(np.array_equal(vectorized.Nsa, scalar.Nsa))
+            self.assertTrue(np.array_equal(vectorized.Qsa, scalar.Qsa))
+
+    def test_exhausted_node_does_not_crash(self):
+        game = TicTacToeGame()
+        args = dotdict({'numMCTSSims': 50, 'cpuct': 1.0})
+        mcts = MCTS(game, DummyNNet(game), args)
+        probs = mcts.getActionProb(game.getInitBoard(), temp=1)
+        self.assertAlmostEqual(1., sum(probs))
+
+    def test_reroot_keeps_only_the_subtree(self):
+        game = GobangGame(7, 4)
+        mcts = MCTS(game, DummyNNet(game), dotdict({'numMCTSSims': 60, 'cpuct': 1.0}))
+        board = game.getInitBoard()
+        probs = mcts.getActionProb(board, temp=1)
+        numNodes = mcts.numNodes
+
+        child, player = game.getNextState(board, 1, int(np.argmax(probs)))
+        child = game.getCanonicalForm(child, player)
+        s = mcts.stateKey(child)
+        row = mcts.Nsa[mcts.nodes[s]].copy()
+
+        mcts.args.numMCTSSims = 0
+        mcts.getActionProb(child, temp=0)
+        self.assertTrue(np.array_equal(row, mcts.Nsa[mcts.nodes[s]]))
+        self.assertNotIn(mcts.stateKey(board), mcts.nodes)
+        self.assertLess(mcts.numNodes, numNodes)
+        self.assertEqual(sorted(mcts.nodes.values()), list(range(mcts.numNodes)))
+        self.assertEqual(0, np.sum(mcts.Nsa[mcts.numNodes:]))
+
+    def test_bounded_tree_evicts(self):
+        game = GobangGame(7, 4)
+        for eviction in ('lru', 'visits'):
+            for numParallelLeaves in (1, 4):
+                args = dotdict({'numMCTSSims': 200, 'cpuct': 1.0, 'maxTreeNodes': 20, 'treeEviction': eviction,
+                                'numParallelLeaves': numParallelLeaves})
+                mcts = MCTS(game, CountingNNet(game), args)
+                board = game.getInitBoard()
+                probs = mcts.getActionProb(board, temp=1)
+                self.assertAlmostEqual(1., sum(probs))
+                self.assertEqual(20, mcts.numNodes)
+                self.assertEqual(20, len(mcts.Ns))
+                self.assertGreater(mcts.evictions, 0)
+                if numParallelLeaves == 1:  # batches also miss on the leaves they collide on
+                    self.assertEqual(mcts.numNodes + mcts.evictions + len(mcts.Es), mcts.misses)
+                self.assertIn(mcts.stateKey(board), mcts.nodes)
+                self.assertEqual(sorted(mcts.nodes.values()), list(range(mcts.numNodes)))
+
+    def test_batched_search(self):
+        game = GobangGame(7, 4)
+        args = dotdict({'numMCTSSims': 40, 'cpuct': 1.0, 'numParallelLeaves': 8})
+        nnet = CountingNNet(game)
+        mcts = MCTS(game, nnet, args)
+        board = game.getInitBoard()
+        probs = mcts.getActionProb(board, temp=1)
+        self.assertAlmostEqual(1., sum(probs))
+        self.assertTrue(max(nnet.batch_sizes) <= 8)
+        self.assertTrue(max(nnet.batch_sizes) > 1)
+
+        # every simulation but the one expanding the root went through a root edge,
+        # and no virtual loss is left behind
+        root = mcts.nodes[mcts.stateKey(board)]
+        self.assertEqual(args.numMCTSSims - 1, mcts.Ns[root])
+        self.assertEqual(np.sum(mcts.Nsa[:mcts.numNodes], axis=1).tolist(), mcts.Ns[:mcts.numNodes].tolist())
+        self.assertTrue(np.all(np.abs(mcts.Qsa[:mcts.numNodes]) <= 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
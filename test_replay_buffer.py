@@ -0,0 +1,82 @@
+"""
+Tests for ReplayBuffer.
+
+To run tests:
+python -m pytest test_replay_buffer.py
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from ReplayBuffer import ReplayBuffer
+
+
+def makeExamples(n, seed):
+    rng = np.random.RandomState(seed)
+    return [(rng.randint(-1, 2, size=(3, 3)), rng.dirichlet(np.ones(10)).astype(np.float32), float(rng.choice([-1, 1])))
+            for _ in range(n)]
+
+
+class TestReplayBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def test_examples_round_trip(self):
+        buffer = ReplayBuffer(self.folder, 5)
+        first, second = makeExamples(4, 0), makeExamples(3, 1)
+        buffer.addIteration(first)
+        buffer.addIteration(second)
+
+        examples = ReplayBuffer(self.folder, 5).examples()
+        self.assertEqual(len(examples), 7)
+        for (board, pi, v), (b, p, w) in zip(first + second, examples):
+            np.testing.assert_array_equal(board, b)
+            np.testing.assert_array_equal(pi, p)
+            self.assertEqual(v, w)
+        np.testing.assert_array_equal(examples[5][0], second[1][0])
+        np.testing.assert_array_equal(examples[-1][0], second[2][0])
+
+        boards, pis, vs = examples.columns([6, 0, 4])
+        for row, i in enumerate([6, 0, 4]):
+            np.testing.assert_array_equal(boards[row], examples[i][0])
+            np.testing.assert_array_equal(pis[row], examples[i][1])
+            self.assertEqual(vs[row], examples[i][2])
+
+    def test_old_shards_are_dropped(self):
+        buffer = ReplayBuffer(self.folder, 2)
+        for iteration in range(1, 5):
+            self.assertEqual(iteration, buffer.addIteration(makeExamples(2, iteration)))
+        self.assertEqual(buffer.iterations(), [3, 4])
+        self.assertEqual(len(buffer), 4)
+        np.testing.assert_array_equal(buffer.examples()[0][0], makeExamples(2, 3)[0][0])
+
+    def test_reopened_buffer_continues_numbering(self):
+        ReplayBuffer(self.folder, 2).addIteration(makeExamples(2, 0))
+        ReplayBuffer(self.folder, 2).addIteration(makeExamples(2, 1))
+        buffer = ReplayBuffer(self.folder, 2)
+        self.assertEqual(buffer.addIteration(makeExamples(2, 2)), 3)
+        self.assertEqual(buffer.iterations(), [2, 3])
+        np.testing.assert_array_equal(buffer.examples()[-1][0], makeExamples(2, 2)[-1][0])
+
+    def test_add_shards(self):
+        other = ReplayBuffer(tempfile.mkdtemp(), 3)
+        for seed in range(3):
+            other.addIteration(makeExamples(2, seed))
+        buffer = ReplayBuffer(self.folder, 2)
+        buffer.addIteration(makeExamples(2, 5))
+        buffer.addShards(other.folder)
+        self.assertEqual(buffer.iterations(), [3, 4])
+        np.testing.assert_array_equal(buffer.examples()[0][0], makeExamples(2, 1)[0][0])
+        self.assertEqual(other.iterations(), [1, 2, 3])
+
+    def test_ragged_boards_are_rejected(self):
+        buffer = ReplayBuffer(self.folder, 2)
+        with self.assertRaises(ValueError):
+            buffer.addIteration([([1, 2, (3, 4)], np.ones(2), 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
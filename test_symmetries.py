@@ -0,0 +1,116 @@
+"""
+Tests for the getSymmetries implementations based on precomputed index
+permutations: they must return exactly what the rot90/fliplr loops they
+replaced returned.
+
+To run tests:
+python -m pytest test_symmetries.py
+"""
+
+import unittest
+
+import numpy as np
+
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from rts.RTSGame import RTSGame
+from rts.src.config import NUM_ACTS
+from santorini.SantoriniGame import SantoriniGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+
+
+def legacySquareSymmetries(n, board, pi, depth=1):
+    # the loop of OthelloGame, GobangGame, TicTacToeGame and RTSGame
+    pi_board = np.reshape(pi[:-1], (n, n, depth) if depth > 1 else (n, n))
+    l = []
+    for i in range(1, 5):
+        for j in [True, False]:
+            newB = np.rot90(board, i)
+            newPi = np.rot90(pi_board, i)
+            if j:
+                newB = np.fliplr(newB)
+                newPi = np.fliplr(newPi)
+            l += [(newB, list(newPi.ravel()) + [pi[-1]])]
+    return l
+
+
+def legacySantoriniSymmetries(board, pi):
+    pieces = np.copy(board)
+    syms = []
+    Pi0 = pi[:64]
+    Pi1 = pi[64:]
+    for i in range(1, 5):
+        for k in [True, False]:
+            newB0 = np.rot90(pieces[0], 1)
+            newB1 = np.rot90(pieces[1], 1)
+            newPi0 = [Pi0[i] for i in SANTORINI_ROTATION]
+            newPi1 = [Pi1[i] for i in SANTORINI_ROTATION]
+            newB0_, newB1_, newPi0_, newPi1_ = newB0, newB1, newPi0, newPi1
+            if k:
+                newB0_ = np.fliplr(newB0)
+                newB1_ = np.fliplr(newB1)
+                newPi0_ = [Pi0[i] for i in SANTORINI_FLIP]
+                newPi1_ = [Pi1[i] for i in SANTORINI_FLIP]
+            syms += [(np.array([newB0_, newB1_]), list(np.ravel([newPi0_, newPi1_])))]
+            pieces[0] = np.copy(newB0)
+            pieces[1] = np.copy(newB1)
+            Pi0 = newPi0
+            Pi1 = newPi1
+    return syms
+
+
+SANTORINI_ROTATION = [18, 20, 23, 17, 22, 16, 19, 21, 34, 36, 39, 33, 38, 32, 35, 37, 58, 60, 63, 57, 62, 56, 59, 61,
+                      10, 12, 15, 9, 14, 8, 11, 13, 50, 52, 55, 49, 54, 48, 51, 53, 2, 4, 7, 1, 6, 0, 3, 5,
+                      26, 28, 31, 25, 30, 24, 27, 29, 42, 44, 47, 41, 46, 40, 43, 45]
+SANTORINI_FLIP = [18, 17, 16, 20, 19, 23, 22, 21, 10, 9, 8, 12, 11, 15, 14, 13, 2, 1, 0, 4, 3, 7, 6, 5,
+                  34, 33, 32, 36, 35, 39, 38, 37, 26, 25, 24, 28, 27, 31, 30, 29, 58, 57, 56, 60, 59, 63, 62, 61,
+                  50, 49, 48, 52, 51, 55, 54, 53, 42, 41, 40, 44, 43, 47, 46, 45]
+
+
+class TestSymmetries(unittest.TestCase):
+
+    def assertSameSymmetries(self, expected, game, board, pi):
+        actual = game.getSymmetries(board, pi)
+        self.assertEqual(len(actual), len(expected))
+        for (b, p), (expectedB, expectedP) in zip(actual, expected):
+            np.testing.assert_array_equal(b, expectedB)
+            self.assertEqual(b.dtype, expectedB.dtype)
+            self.assertEqual(list(p), expectedP)
+
+        boards, pis = game.getSymmetries(board, pi, stacked=True)
+        np.testing.assert_array_equal(boards, np.array([b for b, _ in expected]))
+        np.testing.assert_array_equal(pis, np.array([p for _, p in expected]))
+
+    def test_square_games(self):
+        rng = np.random.RandomState(0)
+        for game in (OthelloGame(6), OthelloGame(8), GobangGame(7), TicTacToeGame(3), TicTacToeGame(4)):
+            for _ in range(3):
+                board = rng.randint(-1, 2, size=(game.n, game.n))
+                pi = rng.rand(game.getActionSize())
+                self.assertSameSymmetries(legacySquareSymmetries(game.n, board, pi), game, board, pi)
+                self.assertSameSymmetries(legacySquareSymmetries(game.n, board, list(pi)), game, board, list(pi))
+
+    def test_rts(self):
+        rng = np.random.RandomState(2)
+        game = RTSGame()
+        board = rng.randint(0, 10, size=game.getInitBoard().shape)
+        pi = rng.rand(game.getActionSize())
+        self.assertSameSymmetries(legacySquareSymmetries(game.n, board, pi, NUM_ACTS), game, board, pi)
+
+        np.random.seed(0)
+        for _ in range(10):
+            symB, symP = game.getRandomSymmetry(board, pi)
+            self.assertTrue(any(np.array_equal(symB, b) and np.array_equal(symP, p)
+                                for b, p in game.getSymmetries(board, pi)))
+
+    def test_santorini(self):
+        rng = np.random.RandomState(1)
+        game = SantoriniGame()
+        for _ in range(3):
+            board = np.array([rng.randint(-2, 3, size=(game.n, game.n)), rng.randint(0, 5, size=(game.n, game.n))])
+            pi = rng.rand(game.getActionSize())
+            self.assertSameSymmetries(legacySantoriniSymmetries(board, pi), game, board, pi)
+
+
+if __name__ == '__main__':
+    unittest.main()
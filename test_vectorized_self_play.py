@@ -0,0 +1,49 @@
+"""
+Tests for VectorizedSelfPlay. These only need numpy: a deterministic dummy
+network stands in for the real ones.
+
+To run tests:
+python -m pytest test_vectorized_self_play.py
+"""
+
+import unittest
+
+import numpy as np
+
+from Coach import Coach
+from test_mcts import CountingNNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import *
+from VectorizedSelfPlay import VectorizedSelfPlay
+
+
+def examples(episode):
+    return [(b.tolist(), list(p), v) for b, p, v in episode]
+
+
+class TestVectorizedSelfPlay(unittest.TestCase):
+
+    def setUp(self):
+        self.game = TicTacToeGame()
+        self.args = dotdict({'numMCTSSims': 8, 'cpuct': 1.0, 'tempThreshold': 4, 'numParallelLeaves': 2})
+
+    def test_single_game_matches_execute_episode(self):
+        np.random.seed(11)
+        expected = examples(Coach(self.game, CountingNNet(self.game), self.args).executeEpisode())
+        np.random.seed(11)
+        episodes = VectorizedSelfPlay(self.game, CountingNNet(self.game), self.args).playEpisodes(1)
+        self.assertEqual([examples(episode) for episode in episodes], [expected])
+
+    def test_games_share_batches(self):
+        self.args.update({'numLockstepGames': 4, 'numParallelLeaves': 1})
+        nnet = CountingNNet(self.game)
+        episodes = list(VectorizedSelfPlay(self.game, nnet, self.args).playEpisodes(6))
+        self.assertEqual(len(episodes), 6)
+        for episode in episodes:
+            self.assertEqual(len(episode) % 8, 0)  # every move gives the 8 symmetries of its board
+        self.assertEqual(max(nnet.batch_sizes), 4)
+        self.assertLess(len(nnet.batch_sizes), sum(nnet.batch_sizes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from utils import dihedralPermutations
 from .TicTacToeLogic import Board
 import numpy as np
 
@@ -17,6 +18,9 @@ Based on the OthelloGame by Surag Nair.
 class TicTacToeGame(Game):
     def __init__(self, n=3):
         self.n = n
+        # getSymmetries applies these to the flattened board and pi, the pass action stays in place
+        self.boardPerms = dihedralPermutations(n)
+        self.actionPerms = np.append(self.boardPerms, np.full((8, 1), n * n), axis=1)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -74,21 +78,14 @@ class TicTacToeGame(Game):
         # return state if player==1, else return -state if player==-1
         return player*board
 
-    def getSymmetries(self, board, pi):
+    def getSymmetries(self, board, pi, stacked=False):
         # mirror, rotational
         assert(len(pi) == self.n**2+1)  # 1 for pass
-        pi_board = np.reshape(pi[:-1], (self.n, self.n))
-        l = []
-
-        for i in range(1, 5):
-            for j in [True, False]:
-                newB = np.rot90(board, i)
-                newPi = np.rot90(pi_board, i)
-                if j:
-                    newB = np.fliplr(newB)
-                    newPi = np.fliplr(newPi)
-                l += [(newB, list(newPi.ravel()) + [pi[-1]])]
-        return l
+        boards = board.ravel()[self.boardPerms].reshape((8,) + board.shape)
+        pis = np.asarray(pi)[self.actionPerms]
+        if stacked:
+            return boards, pis  # all 8 symmetries as two stacked arrays
+        return list(zip(boards, pis))
 
     def stringRepresentation(self, board):
         # 8x8 numpy array (canonical board)
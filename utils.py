@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class AverageMeter(object):
     """From https://github.com/pytorch/examples/blob/master/imagenet/main.py"""
 
@@ -17,6 +20,81 @@ class AverageMeter(object):
         self.avg = self.sum / self.count
 
 
+class SymmetricExamples():
+    """
+    A read-only sequence of training examples (board, pi, v) stored without
+    their symmetries. Every access returns the example under a random
+    symmetry, see Game.getRandomSymmetry.
+    """
+
+    def __init__(self, examples, game):
+        self.examples = examples
+        self.game = game
+
+    def __len__(self):
+        return len(self.examples)
+
+    def __getitem__(self, i):
+        board, pi, v = self.examples[i]
+        board, pi = self.game.getRandomSymmetry(board, pi)
+        return board, pi, v
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def trainingEpochs(examples, epochs):
+    """
+    Splits the training on examples for wrappers that fit on whole arrays,
+    like the keras ones.
+
+    Yields:
+        (examples, epochs): the examples to fit on for that many epochs. Plain
+                            examples are yielded once for all the epochs, while
+                            SymmetricExamples are drawn again for every epoch,
+                            so each epoch sees new random symmetries.
+    """
+    if isinstance(examples, SymmetricExamples):
+        for _ in range(epochs):
+            yield list(examples), 1
+    else:
+        yield examples, epochs
+
+
 class dotdict(dict):
     def __getattr__(self, name):
         return self[name]
+
+
+def zobristTable(*shape):
+    """
+    Returns a nested list of the given shape holding random 64-bit integers,
+    for Zobrist hashing: the key of a state is the xor of the entries of its
+    features. The table only depends on its shape, so keys agree between
+    processes.
+    """
+    rng = np.random.RandomState(list(shape))
+    return rng.randint(np.iinfo(np.uint64).max, size=shape, dtype=np.uint64).tolist()
+
+
+def dihedralPermutations(n, depth=1):
+    """
+    Returns:
+        perms: an (8, n*n*depth) array describing the 8 symmetries of an n x n
+               board holding depth values per square, in the order games
+               return them from getSymmetries: rotations by 1 to 4 quarter
+               turns, each flipped left to right and then not. Row k holds,
+               for every entry of the flattened kth symmetric board, the
+               index of the flattened board entry it comes from, so
+               board.ravel()[perms] stacks all the symmetric boards.
+    """
+    indices = np.arange(n * n * depth).reshape(n, n, depth)
+    perms = []
+    for i in range(1, 5):
+        for j in [True, False]:
+            perm = np.rot90(indices, i)
+            if j:
+                perm = np.fliplr(perm)
+            perms.append(perm.ravel())
+    return np.array(perms)